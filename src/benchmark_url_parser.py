@@ -0,0 +1,131 @@
+import argparse
+import os
+import random
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse, parse_qs
+
+import pandas as pd
+
+from utils.url_parser import (
+    parse_url, normalize_url, extract_language_code, clear_parse_cache, _parse_url
+)
+
+def legacy_parse_url(url: str) -> Optional[Dict[str, Any]]:
+    """The former dict-based parse_url, kept here as the baseline."""
+    try:
+        url = normalize_url(url)
+        parsed = urlparse(url)
+        netloc = parsed.netloc
+        path = parsed.path
+        domain_parts = netloc.split('.')
+        if len(domain_parts) > 2:
+            subdomain = '.'.join(domain_parts[:-2])
+            domain = '.'.join(domain_parts[-2:])
+        else:
+            subdomain = ''
+            domain = netloc
+        return {
+            'original_url': url,
+            'scheme': parsed.scheme,
+            'netloc': netloc,
+            'domain': domain,
+            'subdomain': subdomain,
+            'path': path,
+            'query': parse_qs(parsed.query),
+            'fragment': parsed.fragment,
+            'path_segments': [seg for seg in path.split('/') if seg],
+            'language_code': extract_language_code(subdomain, path)
+        }
+    except Exception:
+        return None
+
+def sample_urls(count: int, seed: int = 42) -> List[str]:
+    """Generate a mix of URLs like the ones in crawl exports."""
+    rng = random.Random(seed)
+    hosts = ['www.example.com', 'fr.example.com', 'old-site.nl', 'shop.example.co.uk', 'example.org']
+    languages = ['', '/fr', '/nl', '/de', '/en-us']
+    words = ['products', 'blog', 'news', 'category', 'item', 'about', 'contact', 'shoes', 'winter-sale']
+    urls = []
+    for i in range(count):
+        path = '/'.join(rng.choice(words) for _ in range(rng.randint(0, 4)))
+        url = f"{rng.choice(['https://', 'http://', ''])}{rng.choice(hosts)}{rng.choice(languages)}/{path}"
+        if rng.random() < 0.3:
+            url += f"?page={i % 50}&sort=price"
+        urls.append(url)
+    return urls
+
+def read_urls(input_file: str) -> List[str]:
+    """Read URLs from the first column of a CSV file or from a TXT file, duplicates included."""
+    if os.path.splitext(input_file)[1].lower() == '.csv':
+        return pd.read_csv(input_file).iloc[:, 0].dropna().astype(str).tolist()
+    with open(input_file, 'r', encoding='utf-8') as f:
+        return [line.strip() for line in f if line.strip()]
+
+def measure(parse: Callable[[str], Any], urls: List[str], repeat: int) -> Dict[str, float]:
+    """Best parse time and retained memory per URL for a parser.
+
+    The parse_url cache is emptied before every run, so cached parsing
+    only profits from duplicates within the input.
+
+    Args:
+        parse: Function that parses one URL
+        urls: URLs to parse
+        repeat: Number of timed runs, the fastest one counts
+
+    Returns:
+        Dictionary with microseconds and bytes per URL
+    """
+    best = float('inf')
+    for _ in range(repeat):
+        clear_parse_cache()
+        start = time.perf_counter()
+        for url in urls:
+            parse(url)
+        best = min(best, time.perf_counter() - start)
+
+    # Only the results are kept, so the traced memory is what parsed URLs cost
+    clear_parse_cache()
+    tracemalloc.start()
+    results = [parse(url) for url in urls]
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del results
+    clear_parse_cache()
+
+    return {
+        'us_per_url': best / len(urls) * 1e6,
+        'bytes_per_url': size / len(urls)
+    }
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Compare the dict-based parser with ParsedURL, without and with the cache."""
+    parser = argparse.ArgumentParser(description='Benchmark parse_url: time and memory per URL')
+    parser.add_argument('input_file', nargs='?', help='Optional CSV (first column) or TXT file with URLs')
+    parser.add_argument('-n', '--count', type=int, default=100000, help='Number of generated URLs without input file')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Number of timed runs per parser')
+    args = parser.parse_args(args)
+
+    urls = read_urls(args.input_file) if args.input_file else sample_urls(args.count)
+    if not urls:
+        print("No URLs to parse")
+        return 1
+
+    print(f"{len(urls)} URLs, {len(set(urls))} distinct")
+    before = measure(legacy_parse_url, urls, args.repeat)
+    uncached = measure(_parse_url, urls, args.repeat)
+    cached = measure(parse_url, urls, args.repeat)
+
+    # Memory of the cached parser includes its cache entries
+    print(f"{'parser':<12}{'us/URL':>10}{'bytes/URL':>12}")
+    for name, stats in (('dict', before), ('ParsedURL', uncached), ('cached', cached)):
+        print(f"{name:<12}{stats['us_per_url']:>10.2f}{stats['bytes_per_url']:>12.0f}")
+    for name, stats in (('ParsedURL', uncached), ('cached', cached)):
+        print(f"{name}: speed-up {before['us_per_url'] / stats['us_per_url']:.2f}x, "
+              f"memory {stats['bytes_per_url'] / before['bytes_per_url']:.0%} of dict")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -15,6 +15,13 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+def positive_int(value: str) -> int:
+    """Argument type for counts that must be at least 1."""
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"must be a positive integer, got {value}")
+    return number
+
 def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
     """Parse command line arguments."""
     parser = argparse.ArgumentParser(
@@ -64,6 +71,15 @@ def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
         default=0.5
     )
     
+    parser.add_argument(
+        '--chunk-size',
+        help='Process CSV input in chunks of this many rows to limit memory use; '
+             'the file is read twice, a first pass fixes the column types so the '
+             'output matches a run without chunks',
+        type=positive_int,
+        default=None
+    )
+    
     parser.add_argument(
         '-v', '--verbose',
         help='Enable verbose logging',
@@ -101,6 +117,24 @@ def main(args: Optional[List[str]] = None) -> int:
         # Initialize the redirect mapper
         mapper = RedirectMapper(args.config_dir)
         
+        # Stream large CSV files through the mapper chunk by chunk
+        if args.chunk_size and os.path.splitext(args.input_file)[1].lower() == '.csv':
+            logger.info(f"Processing {args.input_file} in chunks of {args.chunk_size} rows "
+                        f"with confidence threshold {args.threshold}")
+            mapper.process_file(
+                args.input_file,
+                args.output,
+                args.format,
+                source_col=args.source_col,
+                target_col=args.target_col,
+                confidence_threshold=args.threshold,
+                chunk_size=args.chunk_size
+            )
+            logger.info("URL redirect mapping completed successfully")
+            return 0
+        elif args.chunk_size:
+            logger.warning("--chunk-size only applies to CSV input; loading the whole file")
+        
         # Load data
         logger.info(f"Loading data from {args.input_file}")
         df = mapper.load_data(
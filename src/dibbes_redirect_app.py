@@ -1,45 +1,34 @@
+import os
 import streamlit as st
 import pandas as pd
 import numpy as np
 import io
-from urllib.parse import urlparse
 import string
-from difflib import SequenceMatcher
 from io import BytesIO
-import xlsxwriter
 import time
 import re
-import difflib
-import urllib.parse
+import math
 
-# Definieer similarity_ratio functie vóór alle andere functies die het gebruiken
-def similarity_ratio(s1, s2):
-    """Berekent de overeenkomst tussen twee strings (0-1)."""
-    return difflib.SequenceMatcher(None, s1, s2).ratio() 
+from utils.target_corpus import TargetCorpus
+from utils.result_cache import ResultCache, make_result_key
+from utils.component_scores import ComponentScores, DEFAULT_WEIGHTS
+from utils.match_results import MatchResults
+from utils.trigram_index import TrigramIndex
+from utils.xlsx_stream import SharedOutput, StreamingXlsxWriter, spooled_output
+from matchers.url_matcher import (
+    match_urls, iter_match_urls, assign_status, status_codes,
+    explain_match, explain_results, reason_codes_from_components, STATUS_LABELS, RELIABLE_THRESHOLD, CHECK_THRESHOLD
+)
 
 # Voeg deze regel toe aan het begin van je app, net na de imports
 help_tooltip = ""  # Lege tooltip als fallback
 
-# Eenvoudige Levenshtein afstandsberekening
-def levenshtein_distance(s1, s2):
-    """Bereken de Levenshtein afstand tussen twee strings."""
-    if len(s1) < len(s2):
-        return levenshtein_distance(s2, s1)
-    
-    if len(s2) == 0:
-        return len(s1)
-    
-    previous_row = range(len(s2) + 1)
-    for i, c1 in enumerate(s1):
-        current_row = [i + 1]
-        for j, c2 in enumerate(s2):
-            insertions = previous_row[j + 1] + 1
-            deletions = current_row[j] + 1
-            substitutions = previous_row[j] + (c1 != c2)
-            current_row.append(min(insertions, deletions, substitutions))
-        previous_row = current_row
-    
-    return previous_row[-1]
+# Aantal kandidaten per bron URL waarvan de scorecomponenten bewaard worden
+RERANK_CANDIDATES = 5
+
+# Vanaf dit aantal rijen schrijft de Excel export rij voor rij naar tijdelijke bestanden
+# en zonder hyperlinks (Excel houdt maximaal 65.530 links per werkblad aan)
+EXCEL_CONSTANT_MEMORY_ROWS = 30000
 
 # Voeg deze functie toe voor bestandsverwerking (ongeveer bovenaan de file, onder de imports)
 def process_file(uploaded_file):
@@ -82,129 +71,6 @@ def process_file(uploaded_file):
     
     return urls, df
 
-# Voeg deze functies toe of verbeter de bestaande versies
-def match_urls(source_urls, target_urls, min_confidence=0.5):
-    """Match source URLs met target URLs op basis van verschillende criteria."""
-    results = []
-    
-    for source_url in source_urls:
-        best_match = None
-        best_confidence = 0
-        match_reason = ""
-        detailed_reason = ""
-        
-        # Parse de source URL
-        source_parsed = urllib.parse.urlparse(source_url)
-        source_path = source_parsed.path.strip('/')
-        source_segments = [seg for seg in source_path.split('/') if seg]
-        
-        for target_url in target_urls:
-            # Parse de target URL
-            target_parsed = urllib.parse.urlparse(target_url)
-            target_path = target_parsed.path.strip('/')
-            target_segments = [seg for seg in target_path.split('/') if seg]
-            
-            confidence = 0
-            reason = []
-            
-            # Controleer op exacte match
-            if source_url == target_url:
-                confidence = 1.0
-                reason = ["Exacte URL match"]
-                detailed_reason = "100% exacte match tussen source en target URL"
-                best_match = target_url
-                best_confidence = confidence
-                break
-            
-            # Controleer op domein match
-            if source_parsed.netloc == target_parsed.netloc:
-                confidence += 0.3
-                reason.append("Identiek domein")
-                domain_part = "Identiek domein: " + source_parsed.netloc
-            else:
-                domain_similarity = similarity_ratio(source_parsed.netloc, target_parsed.netloc)
-                if domain_similarity > 0.7:
-                    confidence += 0.2 * domain_similarity
-                    reason.append(f"Vergelijkbaar domein ({int(domain_similarity*100)}%)")
-                    domain_part = f"Vergelijkbaar domein: {source_parsed.netloc} ~ {target_parsed.netloc} ({int(domain_similarity*100)}%)"
-                else:
-                    domain_part = f"Verschillende domeinen: {source_parsed.netloc} ≠ {target_parsed.netloc}"
-            
-            # Controleer segmenten
-            matching_segments = 0
-            segment_details = []
-            
-            # Als beide URLs segmenten hebben
-            if source_segments and target_segments:
-                for i, source_seg in enumerate(source_segments):
-                    if i < len(target_segments):
-                        if source_seg == target_segments[i]:
-                            matching_segments += 1
-                            segment_details.append(f"Segment {i+1}: Exacte match '{source_seg}'")
-                        else:
-                            # Controleer op fuzzy match
-                            seg_similarity = similarity_ratio(source_seg, target_segments[i])
-                            if seg_similarity > 0.7:
-                                matching_segments += seg_similarity
-                                segment_details.append(f"Segment {i+1}: Fuzzy match '{source_seg}' ~ '{target_segments[i]}' ({int(seg_similarity*100)}%)")
-                
-                # Bereken segment confidence
-                if len(source_segments) > 0:
-                    segment_confidence = matching_segments / max(len(source_segments), len(target_segments))
-                    confidence += 0.5 * segment_confidence
-                    
-                    if matching_segments > 0:
-                        reason.append(f"{matching_segments} exacte matches, Jaccard similarity: {int(segment_confidence*100)}%")
-                
-            # Controleer op woordgelijkheid
-            source_words = set(re.findall(r'\w+', source_url.lower()))
-            target_words = set(re.findall(r'\w+', target_url.lower()))
-            
-            if source_words and target_words:
-                word_similarity = len(source_words.intersection(target_words)) / len(source_words.union(target_words))
-                
-                if word_similarity > 0.3:
-                    confidence += 0.2 * word_similarity
-                    reason.append(f"Woordgelijkheid: {int(word_similarity*100)}%")
-                    word_part = f"Woordgelijkheid: {int(word_similarity*100)}% ({len(source_words.intersection(target_words))} overeenkomende woorden)"
-                else:
-                    word_part = "Weinig overeenkomende woorden"
-                
-            # Update beste match als deze beter is
-            if confidence > best_confidence:
-                best_match = target_url
-                best_confidence = confidence
-                match_reason = ", ".join(reason)
-                
-                # Stel een gedetailleerde reden samen
-                if segment_details:
-                    segment_part = "\n".join(segment_details)
-                else:
-                    segment_part = "Geen overeenkomende segmenten"
-                
-                detailed_reason = f"{domain_part}\n{segment_part}\n{word_part}\nTotale score: {int(confidence*100)}%"
-        
-        # Bepaal status op basis van confidence
-        if best_confidence >= 0.75:
-            status = "Betrouwbaar"
-        elif best_confidence >= 0.45:
-            status = "Controle aanbevolen"
-        else:
-            status = "Handmatige controle nodig"
-            
-        # Voeg resultaat toe aan lijst
-        results.append({
-            'Source URL': source_url,
-            'Target URL': best_match if best_match else "",
-            'Score': round(best_confidence, 2),
-            'Status': status,
-            'Reden': match_reason if match_reason else "Geen match gevonden",
-            'Match Details': detailed_reason,
-            'Match gevonden': best_match is not None
-        })
-    
-    return results
-
 def test_matching_quality(source_urls, target_urls):
     """Test de kwaliteit van het matching algoritme en toon scores."""
     test_sample = min(10, len(source_urls))
@@ -215,125 +81,214 @@ def test_matching_quality(source_urls, target_urls):
     
     with st.spinner("Test wordt uitgevoerd..."):
         results = match_urls(sample_urls, target_urls)
+        statuses = assign_status([result['Score'] for result in results])
         
-        for result in results:
+        for result, status in zip(results, statuses):
+            _, match_details = explain_match(result['Source URL'], result['Target URL'])
             confidence_color = (
-                "#28a745" if result['Status'] == "Betrouwbaar"
-                else "#ffc107" if result['Status'] == "Controle aanbevolen"
+                "#28a745" if status == "Betrouwbaar"
+                else "#ffc107" if status == "Controle aanbevolen"
                 else "#dc3545"
             )
             
             st.markdown(f"""
             <div style="margin-bottom: 15px; padding: 15px; border-radius: 5px; background-color: rgba(255,255,255,0.05);">
                 <div style="display: flex; justify-content: space-between; margin-bottom: 10px;">
-                    <span style="font-weight: bold;">Match score: <span style="color: {confidence_color};">{result['Score']}</span></span>
-                    <span style="color: {confidence_color};">{result['Status']}</span>
+                    <span style="font-weight: bold;">Match score: <span style="color: {confidence_color};">{round(result['Score'], 2)}</span></span>
+                    <span style="color: {confidence_color};">{status}</span>
                 </div>
                 <strong>Bron:</strong> <code>{result['Source URL']}</code><br>
                 <strong>Doel:</strong> <code>{result['Target URL']}</code><br>
-                <strong>Details:</strong> {result.get('Match Details', result['Reden'])}
+                <strong>Details:</strong> {match_details}
             </div>
             """, unsafe_allow_html=True)
 
-def generate_export_files(results_df):
-    """Genereer export bestanden in verschillende formaten met betere kleuren en sortering."""
-    exports = {}
-    
-    # Maak een kopie en sorteer deze op status (belangrijke eerst)
-    sorted_df = results_df.copy()
-    status_order = {
-        "Handmatige controle nodig": 0, 
-        "Controle aanbevolen": 1, 
-        "Betrouwbaar": 2
+def add_status(results_df, min_confidence, reliable, check):
+    """Deel de ruwe scores in statussen in zonder opnieuw te matchen."""
+    view = results_df.copy(deep=False)
+    codes = status_codes(view['Score'].to_numpy(), min_confidence, reliable, check)
+    view.insert(3, 'Status', pd.Categorical.from_codes(codes, categories=STATUS_LABELS, ordered=True))
+    view['Score'] = view['Score'].round(2)
+    return view
+
+def build_search_index(match_results):
+    """Trigram indexen over de source URLs en het target corpus van een resultaatset."""
+    return TrigramIndex(match_results.source_urls), TrigramIndex(match_results.target_urls)
+
+def search_mask(match_results, search_index, search_term):
+    """Rijen waarvan de source of target URL de zoekterm bevat (hoofdletterongevoelig)."""
+    source_index, target_index = search_index
+    mask = np.zeros(len(match_results), dtype=bool)
+    mask[source_index.search(search_term)] = True
+    
+    # Extra plek achteraan zodat target positie -1 (geen match) nooit raakt
+    target_hits = np.zeros(len(match_results.target_urls) + 1, dtype=bool)
+    target_hits[target_index.search(search_term)] = True
+    mask |= target_hits[match_results.target_idx]
+    return mask
+
+def filter_positions(match_results, codes, search_index, search_term, status_filter, sort_by):
+    """Bepaal de posities van de zichtbare rijen, gefilterd en in sorteervolgorde."""
+    mask = np.ones(len(match_results), dtype=bool)
+    if search_term:
+        mask &= search_mask(match_results, search_index, search_term)
+    
+    if status_filter != "Alle":
+        mask &= codes == STATUS_LABELS.index(status_filter)
+    
+    positions = np.flatnonzero(mask)
+    if sort_by == "Score (hoog-laag)":
+        positions = positions[np.argsort(-match_results.scores[positions], kind='stable')]
+    elif sort_by == "Score (laag-hoog)":
+        positions = positions[np.argsort(match_results.scores[positions], kind='stable')]
+    elif sort_by == "Status":
+        # Statuscodes lopen van handmatige controle naar betrouwbaar
+        positions = positions[np.argsort(codes[positions], kind='stable')]
+    return positions
+
+def apply_weights(match_results, component_scores, weights):
+    """Herweeg en herrangschik een afgeronde run in één gevectoriseerde stap."""
+    best_target, best_score = component_scores.rerank(weights)
+    components = component_scores.lookup(best_target)
+    return match_results.with_targets(best_target.astype(np.int32), best_score,
+                                      reason_codes_from_components(components), components)
+
+def add_explanations(results_df, match_results, segment_details=False):
+    """Vervang de redencodes door leesbare reden en details, alleen voor deze rijen.
+
+    De index van results_df zijn de rijposities in match_results.
+    """
+    reasons, details = explain_results(match_results, results_df.index, segment_details)
+    view = results_df.drop(columns=['Reden code'])
+    position = results_df.columns.get_loc('Reden code')
+    view.insert(position, 'Reden', reasons)
+    view.insert(position + 1, 'Match Details', details)
+    return view
+
+def format_duration(seconds):
+    """Zet een aantal seconden om naar m:ss."""
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    return f"{minutes}:{seconds:02d}"
+
+def format_candidates(candidates):
+    """Zet een lijst (url, score) kandidaten om naar leesbare tekst."""
+    if not isinstance(candidates, list):
+        return ""
+    return "\n".join(f"{url} ({int(score*100)}%)" for url, score in candidates)
+
+def export_view(results_df, match_results):
+    """Gedeelde gesorteerde weergave voor alle exports, met reden en details."""
+    # Status is categorisch in volgorde van prioriteit (belangrijke eerst), dus direct sorteerbaar
+    sorted_df = results_df.sort_values(by=['Status', 'Score'], ascending=[True, False])
+    
+    # Reden en details worden pas voor de export uitgeschreven
+    return add_explanations(sorted_df, match_results, segment_details=True)
+
+def flatten_candidates(sorted_df):
+    """Excel en CSV krijgen de kandidaten als tekst, JSON houdt de lijst."""
+    if 'Top kandidaten' not in sorted_df.columns:
+        return sorted_df
+    return sorted_df.assign(**{'Top kandidaten': sorted_df['Top kandidaten'].map(format_candidates)})
+
+def export_excel(sorted_df):
+    """Excel export met kleuren per status, verdeeld over bladen bij meer dan 1.048.576 rijen."""
+    flat_df = flatten_candidates(sorted_df)
+    
+    # Kolombreedtes per blad
+    column_widths = {
+        (0, 1): 50,  # URL kolommen breder
+        (2, 2): 10,  # Score kolom
+        (3, 3): 20,  # Status kolom
+        (4, 5): 40,  # Reden/Details kolommen
     }
-    sorted_df['StatusOrder'] = sorted_df['Status'].map(status_order)
-    sorted_df = sorted_df.sort_values(by=['StatusOrder', 'Score'], ascending=[True, False])
-    sorted_df = sorted_df.drop(columns=['StatusOrder'])
-    
-    # Excel export met verbeterde opmaak
-    excel_buffer = BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='xlsxwriter') as writer:
-        sorted_df.to_excel(writer, sheet_name='URL Redirects', index=False)
-        
-        # Haal de workbook en worksheet om opmaak toe te passen
-        workbook = writer.book
-        worksheet = writer.sheets['URL Redirects']
-        
-        # Formaat definiëren met zachtere kleuren
-        header_format = workbook.add_format({
+    if 'Top kandidaten' in flat_df.columns:
+        top_col = flat_df.columns.get_loc('Top kandidaten')
+        column_widths[(top_col, top_col)] = 60  # Alternatieve targets
+    
+    # Elke cel wordt één keer geschreven; grote exports in constant_memory modus
+    # en via een tijdelijk bestand in plaats van volledig in het geheugen
+    large_export = len(flat_df) >= EXCEL_CONSTANT_MEMORY_ROWS
+    excel_output = spooled_output()
+    writer = StreamingXlsxWriter(
+        excel_output,
+        'URL Redirects',
+        flat_df.columns,
+        constant_memory=large_export,
+        strings_to_urls=not large_export,
+        header_format={
             'bold': True, 
             'bg_color': '#4A5568', 
             'font_color': 'white',
             'border': 1, 
             'align': 'center'
-        })
-        
-        # Zachtere kleurtinten
-        betrouwbaar_format = workbook.add_format({
+        },
+        column_widths=column_widths,
+        freeze_header=True,
+        autofilter=True
+    )
+    
+    # Zachtere kleurtinten per status
+    status_formats = {
+        "Betrouwbaar": writer.add_format({
             'bg_color': '#D1FAE5',  # Zacht groen
             'font_color': '#047857'  # Donkergroen voor tekst
-        })
-        
-        controle_format = workbook.add_format({
+        }),
+        "Controle aanbevolen": writer.add_format({
             'bg_color': '#FEF3C7',  # Zacht geel
             'font_color': '#92400E'  # Donker amber voor tekst
-        })
-        
-        handmatig_format = workbook.add_format({
+        }),
+        "Handmatige controle nodig": writer.add_format({
             'bg_color': '#FEE2E2',  # Zacht rood
             'font_color': '#B91C1C'  # Donkerrood voor tekst
         })
-        
-        # Headers opmaken
-        for col_num, value in enumerate(sorted_df.columns.values):
-            worksheet.write(0, col_num, value, header_format)
-        
-        # Rijen opmaken per cel - verbeterde toepassing
-        for row_num in range(len(sorted_df)):
-            # Haal status uit de dataframe
-            status = sorted_df.iloc[row_num]['Status']
-            
-            # Bepaal format op basis van status
-            if status == "Betrouwbaar":
-                row_format = betrouwbaar_format
-            elif status == "Controle aanbevolen":
-                row_format = controle_format
-            else:  # Handmatige controle nodig
-                row_format = handmatig_format
-            
-            # Schrijf elke cel met het juiste format
-            for col_num in range(len(sorted_df.columns)):
-                value = sorted_df.iloc[row_num, col_num]
-                worksheet.write(row_num + 1, col_num, value, row_format)
-        
-        # Kolombreedte aanpassen
-        worksheet.set_column(0, 1, 50)  # URL kolommen breder
-        worksheet.set_column(2, 2, 10)  # Score kolom
-        worksheet.set_column(3, 3, 20)  # Status kolom
-        worksheet.set_column(4, 5, 40)  # Reden/Details kolommen
-        
-        # Auto filter toevoegen
-        worksheet.autofilter(0, 0, len(sorted_df), len(sorted_df.columns) - 1)
-        
-        # Bevries de bovenste rij
-        worksheet.freeze_panes(1, 0)
+    }
     
-    excel_buffer.seek(0)
-    exports['excel'] = excel_buffer.getvalue()
+    # Rijen met het format van de status per rij
+    status_col = flat_df.columns.get_loc('Status')
+    with writer:
+        for row in flat_df.itertuples(index=False, name=None):
+            writer.write_row(row, status_formats[row[status_col]])
     
-    # CSV export (gebruik ook gesorteerde DF)
+    # Het bestand blijft staan; downloads lezen het via SharedOutput.open()
+    return SharedOutput(excel_output)
+
+def export_csv(sorted_df):
+    """CSV export van de gesorteerde weergave."""
     csv_buffer = BytesIO()
-    sorted_df.to_csv(csv_buffer, index=False)
-    csv_buffer.seek(0)
-    exports['csv'] = csv_buffer.getvalue()
-    
-    # JSON export (gebruik ook gesorteerde DF)
-    json_buffer = BytesIO()
-    json_buffer.write(sorted_df.to_json(orient='records').encode())
-    json_buffer.seek(0)
-    exports['json'] = json_buffer.getvalue()
-    
-    return exports
+    flatten_candidates(sorted_df).to_csv(csv_buffer, index=False)
+    return csv_buffer.getvalue()
+
+def export_json(sorted_df):
+    """JSON export van de gesorteerde weergave."""
+    return sorted_df.to_json(orient='records').encode()
+
+EXPORT_BUILDERS = {'excel': export_excel, 'csv': export_csv, 'json': export_json}
+
+# Exports worden gedeeld tussen sessies, per resultaatset en formaat
+@st.cache_resource
+def get_export_cache():
+    """Gedeelde cache voor de exportweergave en gegenereerde exportbestanden."""
+    return ResultCache(max_bytes=256 * 1024 * 1024)
+
+def lazy_export(export_key, export_format, build_view):
+    """Geef een functie die een exportformaat pas bij de eerste download maakt.
+
+    build_view levert de gesorteerde exportweergave; die wordt één keer per
+    export_key gemaakt en door alle formaten gedeeld.
+    """
+    def generate():
+        export_cache = get_export_cache()
+        data = export_cache.get(f"{export_key}:{export_format}")
+        if data is None:
+            sorted_df = export_cache.get(f"{export_key}:view")
+            if sorted_df is None:
+                sorted_df = build_view()
+                export_cache.put(f"{export_key}:view", sorted_df)
+            data = EXPORT_BUILDERS[export_format](sorted_df)
+            export_cache.put(f"{export_key}:{export_format}", data)
+        # Elke download krijgt een eigen lezer op het gedeelde bestand
+        return data.open() if isinstance(data, SharedOutput) else data
+    return generate
 
 # Page config
 st.set_page_config(
@@ -906,6 +861,12 @@ if target_file:
     if target_urls:
         st.success(f"{len(target_urls)} doel URLs geladen")
         
+        # Parse de doel URLs één keer en hergebruik het corpus bij reruns
+        target_corpus = st.session_state.get('target_corpus')
+        if target_corpus is None or target_corpus.urls != target_urls:
+            target_corpus = TargetCorpus(target_urls)
+            st.session_state.target_corpus = target_corpus
+        
         # Preview van data tonen
         st.markdown("<h4 style='font-size: 16px; margin-top: 15px;'>Voorbeeld van geladen doel URLs:</h4>", unsafe_allow_html=True)
         st.dataframe(pd.DataFrame({"Doel URL": target_urls[:5]}), height=150)
@@ -934,12 +895,42 @@ min_confidence = st.slider(
     label_visibility="collapsed"
 )
 
+# Statusgrenzen: alleen de opgeslagen scores worden opnieuw ingedeeld
+with st.expander("Statusgrenzen aanpassen"):
+    reliable_threshold = st.number_input(
+        "Betrouwbaar vanaf:",
+        min_value=0.0,
+        max_value=1.0,
+        value=RELIABLE_THRESHOLD,
+        step=0.05
+    )
+    check_threshold = st.number_input(
+        "Controle aanbevolen vanaf:",
+        min_value=0.0,
+        max_value=1.0,
+        value=CHECK_THRESHOLD,
+        step=0.05
+    )
+
+# Gewichten van de scorecomponenten; herwegen gebruikt de opgeslagen componenten
+with st.expander("Gewichten aanpassen"):
+    weight_cols = st.columns(4)
+    with weight_cols[0]:
+        weight_domain_exact = st.number_input("Identiek domein", 0.0, 1.0, DEFAULT_WEIGHTS[1], 0.05)
+    with weight_cols[1]:
+        weight_domain_similarity = st.number_input("Vergelijkbaar domein", 0.0, 1.0, DEFAULT_WEIGHTS[2], 0.05)
+    with weight_cols[2]:
+        weight_segments = st.number_input("Segmenten", 0.0, 1.0, DEFAULT_WEIGHTS[3], 0.05)
+    with weight_cols[3]:
+        weight_words = st.number_input("Woorden", 0.0, 1.0, DEFAULT_WEIGHTS[4], 0.05)
+match_weights = (DEFAULT_WEIGHTS[0], weight_domain_exact, weight_domain_similarity, weight_segments, weight_words)
+
 # Verbeterde statusindicaties met badges
-st.markdown("""
+st.markdown(f"""
 <div style="display: flex; gap: 15px; margin-top: 15px; flex-wrap: wrap;">
-    <div class="status-badge status-reliable">● Betrouwbaar (≥ 0.75)</div>
-    <div class="status-badge status-check">● Controle aanbevolen (0.45 - 0.75)</div>
-    <div class="status-badge status-manual">● Handmatige controle nodig (< 0.45)</div>
+    <div class="status-badge status-reliable">● Betrouwbaar (≥ {reliable_threshold:.2f})</div>
+    <div class="status-badge status-check">● Controle aanbevolen ({check_threshold:.2f} - {reliable_threshold:.2f})</div>
+    <div class="status-badge status-manual">● Handmatige controle nodig (< {check_threshold:.2f} of onder de drempel)</div>
 </div>
 """, unsafe_allow_html=True)
 
@@ -976,6 +967,26 @@ can_start = 'source_urls' in locals() and 'target_urls' in locals() and len(sour
 if not can_start:
     st.warning("Upload zowel bron als doel URL bestanden om te beginnen")
 else:
+    # Aantal processen voor de matching (1 = serieel)
+    workers = st.number_input(
+        "Aantal parallelle processen:",
+        min_value=1,
+        max_value=os.cpu_count() or 1,
+        value=1,
+        step=1,
+        help="Verdeel de bron URLs over meerdere processen voor grote bestanden"
+    )
+    
+    # Aantal alternatieve targets per bron URL
+    top_k = st.number_input(
+        "Aantal kandidaten per URL:",
+        min_value=1,
+        max_value=10,
+        value=1,
+        step=1,
+        help="Toon naast de beste match ook de volgende beste targets met hun score"
+    )
+    
     col1, col2 = st.columns(2)
     with col1:
         start_mapping = st.button("🔄 Start URL Matching", type="primary", use_container_width=True)
@@ -983,244 +994,323 @@ else:
         test_algorithm = st.button("🧪 Test match-algoritme", use_container_width=True)
     
     if test_algorithm:
-        test_matching_quality(source_urls, target_urls)
+        test_matching_quality(source_urls, target_corpus)
 
 st.markdown("</div>", unsafe_allow_html=True)  # Sluit step-container
 
-# Resultaten weergeven met verbeterde UI
-if 'start_mapping' in locals() and start_mapping:
-    with st.spinner("URLs worden gematcht... Dit kan even duren."):
-        # Toon progressiebalk (simulatie)
-        progress_placeholder = st.empty()
-        progress_placeholder.markdown("""
-        <div class="progress-container">
-            <div class="progress-bar" style="width: 0%"></div>
-        </div>
-        """, unsafe_allow_html=True)
+# Resultaten worden per combinatie van bestanden en instellingen gecachet
+@st.cache_resource
+def get_result_cache():
+    """Gedeelde resultaatcache voor alle sessies van deze server."""
+    return ResultCache(max_bytes=512 * 1024 * 1024)
+
+match_run = None
+match_stats = {}
+if can_start:
+    # De drempel en statusgrenzen horen hier niet bij: die filteren alleen achteraf
+    match_options = {'top_k': top_k}
+    match_key = make_result_key(source_file.getvalue(), target_file.getvalue(), match_options)
+    result_cache = get_result_cache()
+    
+    if start_mapping:
+        match_run = result_cache.get(match_key)
+        if match_run is None:
+            with st.spinner("URLs worden gematcht... Dit kan even duren."):
+                # Echte voortgang: match_urls levert de resultaten per chunk
+                progress_placeholder = st.empty()
+                progress_text = st.empty()
+                partial_placeholder = st.empty()
+                
+                results = []
+                total_sources = len(source_urls)
+                start_time = time.perf_counter()
+                
+                for chunk_results in iter_match_urls(
+                    source_urls,
+                    target_corpus,
+                    workers=workers,
+                    top_k=top_k,
+                    component_k=RERANK_CANDIDATES,
+                    stats=match_stats
+                ):
+                    results.extend(chunk_results)
+                
+                    # Voortgang, doorvoer en geschatte resterende tijd
+                    done = len(results)
+                    elapsed = time.perf_counter() - start_time
+                    throughput = done / elapsed if elapsed > 0 else 0
+                    eta = (total_sources - done) / throughput if throughput > 0 else 0
+                    progress_placeholder.markdown(f"""
+                    <div class="progress-container">
+                        <div class="progress-bar" style="width: {done / total_sources * 100:.1f}%"></div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                    progress_text.caption(
+                        f"{done} van {total_sources} URLs gematcht · {throughput:.1f} URLs/s · "
+                        f"nog ongeveer {format_duration(eta)}"
+                    )
+                
+                    # Toon de laatst gematchte URLs terwijl de rest nog loopt
+                    partial_placeholder.dataframe(
+                        add_status(pd.DataFrame(results[-10:]), min_confidence, reliable_threshold, check_threshold)[
+                            ['Source URL', 'Target URL', 'Score', 'Status']
+                        ],
+                        use_container_width=True
+                    )
+                
+                partial_placeholder.empty()
+                progress_text.caption(f"{len(results)} URLs gematcht in {format_duration(time.perf_counter() - start_time)}")
+                
+                # Toon hoeveel kandidaten de bovengrens-pruning heeft overgeslagen
+                if match_stats.get('candidates'):
+                    pruned_percentage = round(match_stats['pruned'] / match_stats['candidates'] * 100, 1)
+                    st.caption(f"{match_stats['pruned']} van {match_stats['candidates']} kandidaten overgeslagen door pruning ({pruned_percentage}%)")
         
-        # Simuleer voortgang
-        for i in range(1, 101):
-            # Voer de matching uit in stappen
-            progress_placeholder.markdown(f"""
-            <div class="progress-container">
-                <div class="progress-bar" style="width: {i}%"></div>
-            </div>
-            """, unsafe_allow_html=True)
-            if i < 90:
-                time.sleep(0.01)  # Kleine vertraging voor effect
+            # Kolomsgewijs bewaren: posities en scores in plaats van URLs per rij
+            match_run = {
+                'results': MatchResults.from_rows(results, source_urls, target_corpus),
+                'components': ComponentScores.from_results(results)
+            }
+            result_cache.put(match_key, match_run)
+        else:
+            st.caption("Resultaten uit de cache: deze bestanden en instellingen zijn al gematcht")
+        st.session_state.match_key = match_key
+    elif st.session_state.get('match_key') == match_key:
+        # Rerun door een widget: toon de eerder berekende resultaten zonder opnieuw te matchen
+        match_run = result_cache.get(match_key)
+
+# Resultaten weergeven met verbeterde UI
+if match_run is not None and len(match_run['results']) > 0:
+    # Weging en status per combinatie van run en instellingen; paginawissels hergebruiken ze
+    view_key = (match_key, match_weights, min_confidence, reliable_threshold, check_threshold)
+    if st.session_state.get('results_view_key') != view_key:
+        match_results = match_run['results']
+        if match_weights != DEFAULT_WEIGHTS:
+            match_results = apply_weights(match_results, match_run['components'], match_weights)
         
-        # Voer de echte mapping uit
-        results = match_urls(
-            source_urls,
-            target_urls,
-            min_confidence=min_confidence
+        # Status volgt uit de opgeslagen ruwe scores en de huidige grenzen
+        st.session_state.results_view = (
+            match_results,
+            status_codes(match_results.scores, min_confidence, reliable_threshold, check_threshold)
         )
-        
-        # Toon 100% op het eind
-        progress_placeholder.markdown("""
-        <div class="progress-container">
-            <div class="progress-bar" style="width: 100%"></div>
+        st.session_state.results_view_key = view_key
+    match_results, result_status = st.session_state.results_view
+    
+    # Sectiedeler
+    st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
+    
+    # Toon resultaten
+    st.markdown(f"""
+    <div class="step-container">
+        <div class="step-indicator">
+            <div class="step-circle">4</div>
+            <div class="step-title">Resultaten</div>
         </div>
-        """, unsafe_allow_html=True)
-        
-        if results:
-            # Maak DataFrame van resultaten
-            results_df = pd.DataFrame(results)
-            
-            # Sectiedeler
-            st.markdown('<div class="section-divider"></div>', unsafe_allow_html=True)
-            
-            # Toon resultaten
-            st.markdown(f"""
-            <div class="step-container">
-                <div class="step-indicator">
-                    <div class="step-circle">4</div>
-                    <div class="step-title">Resultaten</div>
-                </div>
-            """, unsafe_allow_html=True)
-            
-            # Bereken statistieken
-            total_urls = len(results_df)
-            matched_urls = len(results_df[results_df['Match gevonden'] == True])
-            match_percentage = round((matched_urls / total_urls) * 100, 1) if total_urls > 0 else 0
-            
-            reliable_matches = len(results_df[results_df['Status'] == "Betrouwbaar"])
-            check_recommended = len(results_df[results_df['Status'] == "Controle aanbevolen"])
-            manual_check = len(results_df[results_df['Status'] == "Handmatige controle nodig"])
-            
-            reliable_percentage = round((reliable_matches / total_urls) * 100, 1) if total_urls > 0 else 0
-            check_percentage = round((check_recommended / total_urls) * 100, 1) if total_urls > 0 else 0
-            manual_percentage = round((manual_check / total_urls) * 100, 1) if total_urls > 0 else 0
-            
-            # Toon statistieken in moderne kaarten
-            st.markdown("<h3 style='font-size: 18px; margin: 15px 0;'>Samenvatting</h3>", unsafe_allow_html=True)
-            
-            # Gebruik Streamlit kolommen voor de statistiekkaarten
-            col1, col2, col3, col4, col5 = st.columns(5)
-            
-            with col1:
-                st.markdown(
-                    f"""
-                    <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #4361ee; text-align: center;">
-                        <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Totaal URLs</p>
-                        <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{total_urls}</p>
-                        <p style="color: #00C851; font-size: 14px;">100%</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            with col2:
-                st.markdown(
-                    f"""
-                    <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #4361ee; text-align: center;">
-                        <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Gematcht</p>
-                        <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{matched_urls}</p>
-                        <p style="color: #00C851; font-size: 14px;">{match_percentage}%</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            with col3:
-                st.markdown(
-                    f"""
-                    <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #28a745; text-align: center;">
-                        <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Betrouwbaar</p>
-                        <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{reliable_matches}</p>
-                        <p style="color: #00C851; font-size: 14px;">{reliable_percentage}%</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            with col4:
-                st.markdown(
-                    f"""
-                    <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #ffc107; text-align: center;">
-                        <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Controle aanbevolen</p>
-                        <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{check_recommended}</p>
-                        <p style="color: #ffc107; font-size: 14px;">{check_percentage}%</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            with col5:
-                st.markdown(
-                    f"""
-                    <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #dc3545; text-align: center;">
-                        <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Handmatige controle</p>
-                        <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{manual_check}</p>
-                        <p style="color: #dc3545; font-size: 14px;">{manual_percentage}%</p>
-                    </div>
-                    """,
-                    unsafe_allow_html=True
-                )
-            
-            # URL Mappings
-            st.markdown("<h3 style='font-size: 18px; margin: 25px 0 15px 0;'>URL Mappings</h3>", unsafe_allow_html=True)
-            
-            # Verbeterde zoek- en filterfuncties
-            col1, col2, col3 = st.columns([3, 2, 1])
-            with col1:
-                search_term = st.text_input("Zoek in URLs:", placeholder="Voer zoekterm in...")
-            with col2:
-                status_filter = st.selectbox(
-                    "Filter op status:",
-                    options=["Alle", "Betrouwbaar", "Controle aanbevolen", "Handmatige controle nodig"],
-                    label_visibility="collapsed"
-                )
-            with col3:
-                sort_by = st.selectbox(
-                    "Sorteer op:",
-                    options=["Score (hoog-laag)", "Score (laag-hoog)", "Status"],
-                    label_visibility="collapsed"
-                )
-            
-            # Pas filters toe (bestaande functionaliteit behouden)
-            filtered_df = results_df.copy()
-            if search_term:
-                mask = (
-                    filtered_df['Source URL'].str.contains(search_term, case=False, na=False) | 
-                    filtered_df['Target URL'].str.contains(search_term, case=False, na=False)
-                )
-                filtered_df = filtered_df[mask]
-            
-            if status_filter != "Alle":
-                filtered_df = filtered_df[filtered_df['Status'] == status_filter]
-            
-            # Sorteer resultaten
-            if sort_by == "Score (hoog-laag)":
-                filtered_df = filtered_df.sort_values(by='Score', ascending=False)
-            elif sort_by == "Score (laag-hoog)":
-                filtered_df = filtered_df.sort_values(by='Score', ascending=True)
-            elif sort_by == "Status":
-                # Sorteren op status prioriteit: Handmatige controle eerst, dan Controle aanbevolen, dan Betrouwbaar
-                status_order = {
-                    "Handmatige controle nodig": 0, 
-                    "Controle aanbevolen": 1, 
-                    "Betrouwbaar": 2
-                }
-                filtered_df['StatusOrder'] = filtered_df['Status'].map(status_order)
-                filtered_df = filtered_df.sort_values(by='StatusOrder')
-                filtered_df = filtered_df.drop(columns=['StatusOrder'])
-            
-            # Verbeterde weergave met meer details
-            st.write("Klik op een rij voor details")
-            
-            # Interactieve tabel met moderne styling
-            selection = st.dataframe(
-                filtered_df[['Source URL', 'Target URL', 'Score', 'Status', 'Match Details']].style.apply(
-                    lambda x: [
-                        'background-color: rgba(40, 167, 69, 0.1); color: #28a745' if x['Status'] == 'Betrouwbaar' 
-                        else 'background-color: rgba(255, 193, 7, 0.1); color: #ffc107' if x['Status'] == 'Controle aanbevolen'
-                        else 'background-color: rgba(220, 53, 69, 0.1); color: #dc3545'
-                        for _ in x
-                    ], 
-                    axis=1
-                ),
-                height=400,
-                use_container_width=True
-            )
-            
-            # Export opties
-            st.markdown("<h3 style='font-size: 18px; margin: 25px 0 15px 0;'>Exporteer resultaten</h3>", unsafe_allow_html=True)
-            
-            # Genereer exports (bestaande functionaliteit behouden)
-            exports = generate_export_files(results_df)
-            
-            # Toon moderne download knoppen
-            col1, col2, col3 = st.columns(3)
-            
-            with col1:
-                st.download_button(
-                    "📊 Excel bestand",
-                    data=exports['excel'],
-                    file_name="url_redirects.xlsx",
-                    mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-                    use_container_width=True
-                )
-            
-            with col2:
-                st.download_button(
-                    "📄 CSV bestand",
-                    data=exports['csv'],
-                    file_name="url_redirects.csv",
-                    mime="text/csv",
-                    use_container_width=True
-                )
-            
-            with col3:
-                st.download_button(
-                    "🔄 JSON bestand",
-                    data=exports['json'],
-                    file_name="url_redirects.json",
-                    mime="application/json",
-                    use_container_width=True
-                )
+    """, unsafe_allow_html=True)
+    
+    # Bereken statistieken
+    total_urls = len(match_results)
+    matched_urls = int(match_results.matched.sum())
+    match_percentage = round((matched_urls / total_urls) * 100, 1) if total_urls > 0 else 0
+    
+    manual_check, check_recommended, reliable_matches = np.bincount(result_status, minlength=3).tolist()
+    
+    reliable_percentage = round((reliable_matches / total_urls) * 100, 1) if total_urls > 0 else 0
+    check_percentage = round((check_recommended / total_urls) * 100, 1) if total_urls > 0 else 0
+    manual_percentage = round((manual_check / total_urls) * 100, 1) if total_urls > 0 else 0
+    
+    # Toon statistieken in moderne kaarten
+    st.markdown("<h3 style='font-size: 18px; margin: 15px 0;'>Samenvatting</h3>", unsafe_allow_html=True)
+    
+    # Gebruik Streamlit kolommen voor de statistiekkaarten
+    col1, col2, col3, col4, col5 = st.columns(5)
+    
+    with col1:
+        st.markdown(
+            f"""
+            <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #4361ee; text-align: center;">
+                <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Totaal URLs</p>
+                <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{total_urls}</p>
+                <p style="color: #00C851; font-size: 14px;">100%</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    
+    with col2:
+        st.markdown(
+            f"""
+            <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #4361ee; text-align: center;">
+                <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Gematcht</p>
+                <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{matched_urls}</p>
+                <p style="color: #00C851; font-size: 14px;">{match_percentage}%</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    
+    with col3:
+        st.markdown(
+            f"""
+            <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #28a745; text-align: center;">
+                <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Betrouwbaar</p>
+                <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{reliable_matches}</p>
+                <p style="color: #00C851; font-size: 14px;">{reliable_percentage}%</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    
+    with col4:
+        st.markdown(
+            f"""
+            <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #ffc107; text-align: center;">
+                <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Controle aanbevolen</p>
+                <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{check_recommended}</p>
+                <p style="color: #ffc107; font-size: 14px;">{check_percentage}%</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    
+    with col5:
+        st.markdown(
+            f"""
+            <div style="background-color: #2D2D2D; padding: 15px; border-radius: 8px; border-top: 4px solid #dc3545; text-align: center;">
+                <p style="color: #aaa; font-size: 14px; margin-bottom: 5px;">Handmatige controle</p>
+                <p style="font-size: 24px; font-weight: bold; margin: 10px 0;">{manual_check}</p>
+                <p style="color: #dc3545; font-size: 14px;">{manual_percentage}%</p>
+            </div>
+            """,
+            unsafe_allow_html=True
+        )
+    
+    # URL Mappings
+    st.markdown("<h3 style='font-size: 18px; margin: 25px 0 15px 0;'>URL Mappings</h3>", unsafe_allow_html=True)
+    
+    # Verbeterde zoek- en filterfuncties
+    col1, col2, col3 = st.columns([3, 2, 1])
+    with col1:
+        search_term = st.text_input("Zoek in URLs:", placeholder="Voer zoekterm in...")
+    with col2:
+        status_filter = st.selectbox(
+            "Filter op status:",
+            options=["Alle", "Betrouwbaar", "Controle aanbevolen", "Handmatige controle nodig"],
+            label_visibility="collapsed"
+        )
+    with col3:
+        sort_by = st.selectbox(
+            "Sorteer op:",
+            options=["Score (hoog-laag)", "Score (laag-hoog)", "Status"],
+            label_visibility="collapsed"
+        )
+    
+    # Filteren en sorteren op indexarrays, alleen bij gewijzigde instellingen
+    positions_key = view_key + (search_term, status_filter, sort_by)
+    if st.session_state.get('results_positions_key') != positions_key:
+        # De zoekindex hangt alleen van de URLs af en wordt één keer per resultaatset gebouwd
+        if search_term and st.session_state.get('results_search_key') != match_key:
+            st.session_state.results_search = build_search_index(match_run['results'])
+            st.session_state.results_search_key = match_key
+        st.session_state.results_positions = filter_positions(
+            match_results, result_status, st.session_state.get('results_search'),
+            search_term, status_filter, sort_by
+        )
+        st.session_state.results_positions_key = positions_key
+        st.session_state.results_page = 1
+    positions = st.session_state.results_positions
+    
+    # Paginering: alleen de zichtbare pagina wordt opgemaakt en verstuurd
+    col1, col2, col3 = st.columns([3, 1, 1])
+    with col2:
+        page_size = st.selectbox("Rijen per pagina:", options=[25, 50, 100, 250], index=1)
+    page_count = max(1, math.ceil(len(positions) / page_size))
+    st.session_state.results_page = min(st.session_state.get('results_page', 1), page_count)
+    with col3:
+        page = st.number_input("Pagina:", min_value=1, max_value=page_count, step=1, key='results_page')
+    page_positions = positions[(page - 1) * page_size:page * page_size]
+    with col1:
+        if len(positions):
+            st.caption(f"Rij {(page - 1) * page_size + 1}–{(page - 1) * page_size + len(page_positions)} van {len(positions)}")
+        else:
+            st.caption("Geen resultaten voor deze zoekopdracht of filter")
+    
+    # Verbeterde weergave met meer details
+    st.write("Klik op een rij voor details")
+    
+    # Status en uitleg alleen voor de rijen van deze pagina
+    filtered_df = add_status(match_results.to_frame(page_positions), min_confidence, reliable_threshold, check_threshold)
+    filtered_df = add_explanations(filtered_df, match_results, segment_details=True)
+    
+    # Interactieve tabel met moderne styling
+    display_columns = ['Source URL', 'Target URL', 'Score', 'Status', 'Match Details']
+    if 'Top kandidaten' in filtered_df.columns:
+        filtered_df['Top kandidaten'] = filtered_df['Top kandidaten'].map(format_candidates)
+        display_columns.append('Top kandidaten')
+    
+    selection = st.dataframe(
+        filtered_df[display_columns].style.apply(
+            lambda x: [
+                'background-color: rgba(40, 167, 69, 0.1); color: #28a745' if x['Status'] == 'Betrouwbaar' 
+                else 'background-color: rgba(255, 193, 7, 0.1); color: #ffc107' if x['Status'] == 'Controle aanbevolen'
+                else 'background-color: rgba(220, 53, 69, 0.1); color: #dc3545'
+                for _ in x
+            ], 
+            axis=1
+        ),
+        height=400,
+        use_container_width=True
+    )
+    
+    # Export opties
+    st.markdown("<h3 style='font-size: 18px; margin: 25px 0 15px 0;'>Exporteer resultaten</h3>", unsafe_allow_html=True)
+    
+    # Exports worden pas bij de eerste download van een formaat gemaakt, per resultaatset en instellingen
+    export_key = make_result_key(match_key.encode(), b"", {
+        'weights': match_weights,
+        'min_confidence': min_confidence,
+        'reliable': reliable_threshold,
+        'check': check_threshold
+    })
+    def build_export_view():
+        results_df = add_status(match_results.to_frame(), min_confidence, reliable_threshold, check_threshold)
+        return export_view(results_df, match_results)
+    exports = {
+        export_format: lazy_export(export_key, export_format, build_export_view)
+        for export_format in EXPORT_BUILDERS
+    }
+    
+    # Toon moderne download knoppen
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.download_button(
+            "📊 Excel bestand",
+            data=exports['excel'],
+            file_name="url_redirects.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+            use_container_width=True
+        )
+    
+    with col2:
+        st.download_button(
+            "📄 CSV bestand",
+            data=exports['csv'],
+            file_name="url_redirects.csv",
+            mime="text/csv",
+            use_container_width=True
+        )
+    
+    with col3:
+        st.download_button(
+            "🔄 JSON bestand",
+            data=exports['json'],
+            file_name="url_redirects.json",
+            mime="application/json",
+            use_container_width=True
+        )
 
-            st.markdown("</div>", unsafe_allow_html=True)  # Sluit step-container
+    st.markdown("</div>", unsafe_allow_html=True)  # Sluit step-container
 
 # Footer Opschoning
 st.markdown("""
@@ -1,9 +1,10 @@
 import streamlit as st
 import pandas as pd
-import io
 import re
 from urllib.parse import urlparse
 
+from utils.xlsx_stream import SharedOutput, StreamingXlsxWriter, spooled_output
+
 # Page config
 st.set_page_config(
     page_title="URL Redirect Mapping Tool",
@@ -316,14 +317,17 @@ def process_results(combined_df):
     # Export opties
     st.subheader("Exporteren")
     
-    # Excel export
-    excel_buffer = io.BytesIO()
-    with pd.ExcelWriter(excel_buffer, engine='openpyxl') as writer:
-        combined_df.to_excel(writer, index=False, sheet_name='Redirects')
+    # Excel export: rij voor rij, verdeeld over bladen boven de limiet van Excel,
+    # via een tijdelijk bestand in plaats van volledig in het geheugen
+    excel_output = spooled_output()
+    with StreamingXlsxWriter(excel_output, 'Redirects', combined_df.columns) as writer:
+        for row in combined_df.itertuples(index=False, name=None):
+            writer.write_row(row)
     
+    # Streamlit leest het bestand zelf, zonder eerst een kopie als bytes
     st.download_button(
         label="Download als Excel (.xlsx)",
-        data=excel_buffer.getvalue(),
+        data=SharedOutput(excel_output).open(),
         file_name="redirect_mappings.xlsx",
         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
     )
@@ -8,6 +8,8 @@ from difflib import SequenceMatcher
 from io import BytesIO
 import xlsxwriter
 
+from utils.distance import similarity_above
+
 # Page config
 st.set_page_config(
     page_title="Taalvariant URL Matcher",
@@ -110,7 +112,8 @@ def translate_segment(segment, dictionary):
     best_score = 0.7  # Minimale score om als match te beschouwen
     
     for source, target in dictionary.items():
-        score = similarity_ratio(normalized, source)
+        # Alleen de volledige ratio berekenen als de snelle bovengrens best_score haalt
+        score = similarity_above(normalized, source, best_score)
         if score > best_score:
             best_score = score
             best_match = target
@@ -186,7 +189,7 @@ def match_by_segment_translation(source_urls, target_urls, dictionary):
                     target = target_segments[i]
                     
                     # Check exacte match of hoge gelijkenis
-                    if source_translated == target or similarity_ratio(source_translated, target) > 0.6:
+                    if source_translated == target or similarity_above(source_translated, target, 0.6) > 0.6:
                         matching_segments += 1
                 
                 # Bereken score
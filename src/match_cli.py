@@ -0,0 +1,145 @@
+import argparse
+import logging
+import os
+import sys
+import time
+import pandas as pd
+from typing import List, Optional
+
+from matchers.url_matcher import match_urls_parallel, assign_status, explain_results
+from utils.target_corpus import TargetCorpus
+from utils.match_results import MatchResults
+
+# Set up logging
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+def read_urls(input_file: str) -> List[str]:
+    """Read URLs from the first column of a CSV/Excel file or from a TXT file.
+
+    Args:
+        input_file: Path to the input file
+
+    Returns:
+        De-duplicated list of URLs in file order
+    """
+    file_ext = os.path.splitext(input_file)[1].lower()
+
+    if file_ext == '.csv':
+        urls = pd.read_csv(input_file).iloc[:, 0].dropna().tolist()
+    elif file_ext in ['.xlsx', '.xls']:
+        urls = pd.read_excel(input_file).iloc[:, 0].dropna().tolist()
+    elif file_ext == '.txt':
+        with open(input_file, 'r', encoding='utf-8') as f:
+            urls = [line.strip() for line in f if line.strip()]
+    else:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+
+    urls = [str(url) for url in urls if url]
+    return list(dict.fromkeys(urls))
+
+def parse_args(args: Optional[List[str]] = None) -> argparse.Namespace:
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description='Headless source-to-target URL matching'
+    )
+
+    parser.add_argument(
+        'source_file',
+        help='File with source URLs (CSV, Excel, TXT)'
+    )
+
+    parser.add_argument(
+        'target_file',
+        help='File with target URLs (CSV, Excel, TXT)'
+    )
+
+    parser.add_argument(
+        '-o', '--output',
+        help='Output CSV file path',
+        default='url_redirects.csv'
+    )
+
+    parser.add_argument(
+        '-w', '--workers',
+        help='Number of worker processes (default: all cores)',
+        type=int,
+        default=None
+    )
+
+    parser.add_argument(
+        '--chunk-size',
+        help='Number of source URLs per worker task',
+        type=int,
+        default=None
+    )
+
+    parser.add_argument(
+        '--threshold',
+        help='Confidence threshold (0.0-1.0)',
+        type=float,
+        default=0.5
+    )
+
+    parser.add_argument(
+        '-v', '--verbose',
+        help='Enable verbose logging',
+        action='store_true'
+    )
+
+    return parser.parse_args(args)
+
+def main(args: Optional[List[str]] = None) -> int:
+    """Main entry point for headless matching."""
+    args = parse_args(args)
+
+    if args.verbose:
+        logging.getLogger().setLevel(logging.DEBUG)
+
+    for input_file in (args.source_file, args.target_file):
+        if not os.path.exists(input_file):
+            logger.error(f"Input file does not exist: {input_file}")
+            return 1
+
+    try:
+        source_urls = read_urls(args.source_file)
+        target_corpus = TargetCorpus(read_urls(args.target_file))
+        logger.info(f"Matching {len(source_urls)} source URLs against {len(target_corpus)} target URLs")
+
+        start = time.perf_counter()
+        match_stats = {}
+        results = match_urls_parallel(
+            source_urls,
+            target_corpus,
+            workers=args.workers,
+            chunk_size=args.chunk_size,
+            stats=match_stats,
+            component_k=1
+        )
+        logger.info(f"Matched {len(results)} URLs in {time.perf_counter() - start:.1f}s")
+        logger.info(f"Pruned {match_stats.get('pruned', 0)} of {match_stats.get('candidates', 0)} candidates")
+
+        match_results = MatchResults.from_rows(results, source_urls, target_corpus)
+        results_df = match_results.to_frame()
+        results_df.insert(3, 'Status', assign_status(results_df['Score'].to_numpy(), min_confidence=args.threshold))
+        reasons, details = explain_results(match_results, segment_details=True)
+        results_df = results_df.drop(columns=['Reden code'])
+        results_df.insert(4, 'Reden', reasons)
+        results_df.insert(5, 'Match Details', details)
+        results_df['Score'] = results_df['Score'].round(2)
+        results_df.to_csv(args.output, index=False, encoding='utf-8')
+        logger.info(f"Exported results to {args.output}")
+        return 0
+
+    except Exception as e:
+        logger.error(f"Error matching URLs: {str(e)}")
+        if args.verbose:
+            import traceback
+            traceback.print_exc()
+        return 1
+
+if __name__ == "__main__":
+    sys.exit(main())
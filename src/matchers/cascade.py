@@ -0,0 +1,89 @@
+import logging
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+from utils.url_parser import ParsedURL
+
+logger = logging.getLogger(__name__)
+
+Match = Tuple[str, float, str]
+
+class MatcherStage(NamedTuple):
+    """One matcher in the cascade with the highest confidence it can return."""
+    name: str
+    ceiling: float
+    run: Callable[[ParsedURL, Any], Optional[Match]]
+    applies: Callable[[Any], bool]
+
+class MatcherCascade:
+    """Run matchers from the highest confidence ceiling down and stop early.
+
+    Stages are given in priority order: when two matches have the same
+    confidence, the stage listed first wins, as with a stable sort of all
+    matches. A stage is skipped when its ceiling cannot beat the best match
+    so far, or cannot reach the confidence threshold.
+    """
+
+    def __init__(self, stages: List[MatcherStage]):
+        """Order the stages once.
+
+        Args:
+            stages: Matchers in priority order
+        """
+        self.stages = sorted(
+            ((priority, stage) for priority, stage in enumerate(stages)),
+            key=lambda item: -item[1].ceiling
+        )
+        self.run_counts: Dict[str, int] = {}
+        self.skip_counts: Dict[str, int] = {}
+        self.reset_stats()
+
+    def reset_stats(self) -> None:
+        """Start counting runs and skips from zero."""
+        self.run_counts = {stage.name: 0 for _, stage in self.stages}
+        self.skip_counts = {stage.name: 0 for _, stage in self.stages}
+
+    def match(self, parsed_url: ParsedURL, route: Any,
+              threshold: float = 0.0) -> Optional[Match]:
+        """Find the best match for one URL.
+
+        Args:
+            parsed_url: Parsed URL components
+            route: DomainRoute of the URL's domain
+            threshold: Minimum confidence a match needs to be used
+
+        Returns:
+            Tuple of (target_url, confidence_score, reason) of the best match,
+            or None if no stage matched. Once no remaining stage can reach the
+            threshold, a best match below it may be returned as is
+        """
+        best = None
+        best_priority = 0
+
+        for priority, stage in self.stages:
+            if not stage.applies(route):
+                continue
+
+            if stage.ceiling < threshold or (best is not None and (
+                stage.ceiling < best[1]
+                or (stage.ceiling == best[1] and priority > best_priority)
+            )):
+                self.skip_counts[stage.name] += 1
+                continue
+
+            self.run_counts[stage.name] += 1
+            result = stage.run(parsed_url, route)
+            if result is None:
+                continue
+            if best is None or result[1] > best[1] or (result[1] == best[1] and priority < best_priority):
+                best = result
+                best_priority = priority
+
+        return best
+
+    def log_stats(self) -> None:
+        """Log how often every stage ran and was skipped."""
+        for _, stage in self.stages:
+            logger.info(
+                f"Matcher {stage.name}: {self.run_counts[stage.name]} runs, "
+                f"{self.skip_counts[stage.name]} skipped"
+            )
@@ -0,0 +1,103 @@
+import logging
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+from matchers.pattern_matcher import PatternRuleSet
+
+logger = logging.getLogger(__name__)
+
+class DomainRoute(NamedTuple):
+    """Configuration of one source domain, resolved once for all its URLs.
+
+    Unmapped domains keep their own domain as target, which the matchers
+    take from the parsed URL (target_domain is only set when mapped).
+    """
+    domain: str
+    target_domain: Optional[str]
+    mapped: bool
+    url_structure: str
+    pattern_blocks: List[Tuple[Any, List[int]]]
+    language_mappings: Dict[str, str]
+    default_target_language: str
+    dictionaries: Dict[str, Dict[str, str]]
+
+    @property
+    def use_language(self) -> bool:
+        return self.mapped
+
+    @property
+    def use_pattern(self) -> bool:
+        return bool(self.pattern_blocks)
+
+    @property
+    def use_segment(self) -> bool:
+        return bool(self.dictionaries)
+
+    @property
+    def use_fuzzy(self) -> bool:
+        return self.mapped and self.target_domain != self.domain
+
+def dictionaries_by_language(dictionaries: Dict[str, Dict[str, str]]) -> Dict[str, Dict[str, str]]:
+    """Resolve the dictionary per language code: 'xx_en' first, then 'xx'.
+
+    Args:
+        dictionaries: Language-specific word mappings keyed by file name
+
+    Returns:
+        Dictionary to use per language code
+    """
+    languages = {key[:-3] for key in dictionaries if key.endswith('_en')} | set(dictionaries)
+    return {
+        language: dictionaries[f"{language}_en"] if f"{language}_en" in dictionaries else dictionaries[language]
+        for language in languages
+        if f"{language}_en" in dictionaries or language in dictionaries
+    }
+
+def build_domain_routes(
+    domain_mappings: Dict[str, Any],
+    language_config: Dict[str, Any],
+    dictionaries: Dict[str, Dict[str, str]],
+    pattern_rules: PatternRuleSet
+) -> Tuple[Dict[str, DomainRoute], Optional[DomainRoute]]:
+    """Precompile the matcher dispatch table per source domain.
+
+    Args:
+        domain_mappings: Configuration for domain mappings
+        language_config: Configuration for language handling
+        dictionaries: Language-specific word mappings
+        pattern_rules: Compiled pattern rules
+
+    Returns:
+        Tuple of (route per configured domain, route for all other domains).
+        The second item is None when no matcher can apply to an unmapped
+        domain, so such URLs can be rejected right away
+    """
+    domains = domain_mappings.get('domains', {})
+    url_structures = language_config.get('url_structures', {})
+    language_mappings = language_config.get('mappings', {})
+    default_target_language = language_config.get('default_target', 'en')
+    by_language = dictionaries_by_language(dictionaries)
+
+    def route_for(domain: str, mapped: bool) -> DomainRoute:
+        target_domain = domains.get(domain, domain) if mapped else None
+        return DomainRoute(
+            domain=domain,
+            target_domain=target_domain,
+            mapped=mapped,
+            url_structure=url_structures.get(target_domain, 'path') if mapped else 'path',
+            pattern_blocks=pattern_rules.blocks_for(domain),
+            language_mappings=language_mappings,
+            default_target_language=default_target_language,
+            dictionaries=by_language
+        )
+
+    routes = {domain: route_for(domain, True) for domain in domains}
+    for domain in pattern_rules.domain_blocks:
+        if domain not in routes:
+            routes[domain] = route_for(domain, False)
+
+    default_route = route_for('', False)
+    if not (default_route.use_pattern or default_route.use_segment):
+        default_route = None
+
+    logger.debug(f"Built dispatch table for {len(routes)} domains")
+    return routes, default_route
@@ -2,12 +2,18 @@ from typing import Dict, Tuple, List, Optional, Any
 import logging
 import re
 
+from utils.url_parser import ParsedURL
+
 logger = logging.getLogger(__name__)
 
+# Confidence of every language-based match
+LANGUAGE_CONFIDENCE = 0.85
+
 def match_by_language(
-    parsed_url: Dict[str, Any],
+    parsed_url: ParsedURL,
     domain_mappings: Dict[str, str],
-    language_config: Dict[str, Any]
+    language_config: Dict[str, Any],
+    route: Optional[Any] = None
 ) -> Optional[Tuple[str, float, str]]:
     """Match URLs based on language codes and domain mappings.
     
@@ -15,35 +21,44 @@ def match_by_language(
         parsed_url: Parsed URL components
         domain_mappings: Configuration for domain mappings
         language_config: Configuration for language handling
+        route: Optional DomainRoute with the configuration of this URL's
+            domain already resolved
         
     Returns:
         Tuple of (target_url, confidence_score, reason) or None if no match
     """
-    original_url = parsed_url['original_url']
-    domain = parsed_url['domain']
-    subdomain = parsed_url['subdomain']
-    path = parsed_url['path']
-    language_code = parsed_url['language_code']
+    original_url = parsed_url.original_url
+    domain = parsed_url.domain
+    subdomain = parsed_url.subdomain
+    path = parsed_url.path
+    language_code = parsed_url.language_code
     
     # No language code detected
     if not language_code:
         return None
         
-    # Check if this domain has a mapping
-    if domain not in domain_mappings.get('domains', {}):
-        return None
-    
-    target_domain = domain_mappings['domains'].get(domain)
-    
-    # Get language mapping configuration
-    lang_mappings = language_config.get('mappings', {})
-    default_target_lang = language_config.get('default_target', 'en')
-    
-    # Map source language to target language
-    target_lang = lang_mappings.get(language_code, default_target_lang)
-    
-    # Determine target URL structure based on config
-    target_url_structure = language_config.get('url_structures', {}).get(target_domain, 'path')
+    if route is not None:
+        if not route.mapped:
+            return None
+        target_domain = route.target_domain
+        target_lang = route.language_mappings.get(language_code, route.default_target_language)
+        target_url_structure = route.url_structure
+    else:
+        # Check if this domain has a mapping
+        if domain not in domain_mappings.get('domains', {}):
+            return None
+        
+        target_domain = domain_mappings['domains'].get(domain)
+        
+        # Get language mapping configuration
+        lang_mappings = language_config.get('mappings', {})
+        default_target_lang = language_config.get('default_target', 'en')
+        
+        # Map source language to target language
+        target_lang = lang_mappings.get(language_code, default_target_lang)
+        
+        # Determine target URL structure based on config
+        target_url_structure = language_config.get('url_structures', {}).get(target_domain, 'path')
     
     # Get path without language code if it's in the path
     path_without_lang = re.sub(r'^/[a-z]{2}(-[a-z]{2})?(\/|$)', '/', path)
@@ -61,7 +76,7 @@ def match_by_language(
         # Default structure
         target_url = f"https://{target_domain}{path_without_lang}"
     
-    confidence = 0.85  # High confidence for language-based matching
+    confidence = LANGUAGE_CONFIDENCE  # High confidence for language-based matching
     reason = f"Language-based mapping: {language_code} → {target_lang} on {target_domain}"
     
     logger.debug(f"Language match: {original_url} → {target_url} ({confidence})")
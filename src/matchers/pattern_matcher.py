@@ -1,58 +1,205 @@
 import re
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
+
+from utils.url_parser import ParsedURL
 
 logger = logging.getLogger(__name__)
 
+# Confidence of every pattern match
+PATTERN_CONFIDENCE = 0.9
+
+# Constructs that depend on group numbers/names or global flags; patterns that
+# use them cannot be wrapped into a shared alternation
+_NOT_COMBINABLE = re.compile(r'\\[1-9]|\\g|\(\?P|\(\?\(|\(\?[aiLmsux]+\)')
+
+class PatternRule:
+    """One compiled source/target pattern pair from the domain mappings."""
+
+    def __init__(self, source_pattern: str, target_pattern: str):
+        self.source_pattern = source_pattern
+        self.target_pattern = target_pattern
+        self.regex = re.compile(source_pattern)
+        self.reason = f"Pattern match: {source_pattern} → {target_pattern}"
+
+    def apply(self, path: str, match: Optional[re.Match] = None) -> Optional[str]:
+        """Rewrite a path whose start matches this rule.
+
+        Gives the same result as ``re.sub(source_pattern, target_pattern, path)``
+        without a second regex pass when the pattern can only match once.
+
+        Args:
+            path: URL path to rewrite
+            match: Match of this rule at the start of the path, if already known
+
+        Returns:
+            Rewritten path, or None if the rule does not match
+        """
+        if match is None:
+            match = self.regex.match(path)
+            if match is None:
+                return None
+
+        # '^' never matches at a search position > 0, so anchored patterns stop here
+        end = match.end()
+        if end > match.start() and self.regex.search(path, end) is None:
+            return match.expand(self.target_pattern) + path[end:]
+        return self.regex.sub(self.target_pattern, path)
+
+class PatternRuleSet:
+    """Pattern rules compiled once per configuration and indexed by domain.
+
+    Every domain gets its applicable rules in configuration order. Runs of
+    consecutive rules are combined into one alternation, so a path is
+    matched against a single regex per run instead of once per rule.
+    """
+
+    def __init__(self, domain_mappings: Dict[str, Any]):
+        """Compile the 'patterns' section of the domain mappings.
+
+        Args:
+            domain_mappings: Configuration for domain mappings
+        """
+        self.rules: List[PatternRule] = []
+        rule_domains: List[List[str]] = []
+
+        for pattern_config in domain_mappings.get('patterns', []):
+            source_pattern = pattern_config.get('source_pattern')
+            target_pattern = pattern_config.get('target_pattern')
+            try:
+                rule = PatternRule(source_pattern, target_pattern)
+            except (re.error, TypeError) as e:
+                logger.error(f"Skipping invalid pattern {source_pattern}: {str(e)}")
+                continue
+            self.rules.append(rule)
+            rule_domains.append(pattern_config.get('domains', []))
+
+        # Rules without domains apply everywhere, the others only to their own domains
+        generic = [i for i, domains in enumerate(rule_domains) if not domains]
+        specific_domains = {domain for domains in rule_domains for domain in domains}
+
+        self.default_blocks = self._build_blocks(generic)
+        self.domain_blocks: Dict[str, List[Tuple[Optional[re.Pattern], List[int]]]] = {
+            domain: self._build_blocks([
+                i for i, domains in enumerate(rule_domains) if not domains or domain in domains
+            ])
+            for domain in specific_domains
+        }
+
+    def _build_blocks(self, rule_ids: List[int]) -> List[Tuple[Optional[re.Pattern], List[int]]]:
+        """Group consecutive combinable rules into alternations, keeping their order."""
+        blocks: List[Tuple[Optional[re.Pattern], List[int]]] = []
+        run: List[int] = []
+
+        def close_run():
+            if len(run) == 1:
+                blocks.append((None, list(run)))
+            elif run:
+                combined = "|".join(f"(?P<r{i}>{self.rules[i].source_pattern})" for i in run)
+                try:
+                    blocks.append((re.compile(combined), list(run)))
+                except re.error:
+                    blocks.extend((None, [i]) for i in run)
+            run.clear()
+
+        for i in rule_ids:
+            if _NOT_COMBINABLE.search(self.rules[i].source_pattern):
+                close_run()
+                blocks.append((None, [i]))
+            else:
+                run.append(i)
+        close_run()
+        return blocks
+
+    def __len__(self) -> int:
+        return len(self.rules)
+
+    def blocks_for(self, domain: str) -> List[Tuple[Optional[re.Pattern], List[int]]]:
+        """Rule blocks that apply to a domain, in configuration order."""
+        return self.domain_blocks.get(domain, self.default_blocks)
+
+    def match(self, domain: str, path: str,
+              blocks: Optional[List[Tuple[Optional[re.Pattern], List[int]]]] = None) -> Optional[Tuple[PatternRule, str]]:
+        """Find the first rule for a domain that matches a path.
+
+        Args:
+            domain: Source domain
+            path: URL path
+            blocks: Rule blocks of the domain, if already looked up
+
+        Returns:
+            Tuple of (rule, rewritten path) or None if no rule matches
+        """
+        if blocks is None:
+            blocks = self.blocks_for(domain)
+
+        for combined, rule_ids in blocks:
+            candidates = rule_ids
+            if combined is not None:
+                match = combined.match(path)
+                if match is None:
+                    continue
+                # The alternation reports the first rule of the run that matches
+                candidates = rule_ids[rule_ids.index(int(match.lastgroup[1:])):]
+
+            for rule_id in candidates:
+                rule = self.rules[rule_id]
+                try:
+                    target_path = rule.apply(path)
+                except Exception as e:
+                    logger.error(f"Error applying pattern {rule.source_pattern} to {path}: {str(e)}")
+                    continue
+                if target_path is not None:
+                    return rule, target_path
+
+        return None
+
+def compile_pattern_rules(domain_mappings: Dict[str, Any]) -> PatternRuleSet:
+    """Compile the pattern rules of a domain mapping configuration once."""
+    return PatternRuleSet(domain_mappings)
+
 def match_by_pattern(
-    parsed_url: Dict[str, Any],
-    domain_mappings: Dict[str, Any]
+    parsed_url: ParsedURL,
+    domain_mappings: Dict[str, Any],
+    rules: Optional[PatternRuleSet] = None,
+    route: Optional[Any] = None
 ) -> Optional[Tuple[str, float, str]]:
     """
     Match URLs based on regex patterns defined in the domain mappings.
-    
+
     Args:
         parsed_url: Parsed URL components
         domain_mappings: Configuration for domain mappings
-        
+        rules: Rules compiled with compile_pattern_rules; compiled on the fly
+            when omitted, so pass them in when matching many URLs
+        route: Optional DomainRoute with the rule blocks and target domain
+            of this URL's domain already resolved
+
     Returns:
         Tuple of (target_url, confidence_score, reason) or None if no match
     """
-    domain = parsed_url['domain']
-    path = parsed_url['path']
-    original_url = parsed_url['original_url']
-    
-    # Get patterns from domain mappings
-    patterns = domain_mappings.get('patterns', [])
-    
-    for pattern_config in patterns:
-        source_pattern = pattern_config.get('source_pattern')
-        target_pattern = pattern_config.get('target_pattern')
-        applicable_domains = pattern_config.get('domains', [])
-        
-        # Skip if this pattern is not applicable for this domain
-        if applicable_domains and domain not in applicable_domains:
-            continue
-            
-        # Try to match the pattern
-        match = re.match(source_pattern, path)
-        if match:
-            # Apply the target pattern with captured groups
-            try:
-                target_path = re.sub(source_pattern, target_pattern, path)
-                
-                # Construct the target URL
-                target_domain = domain_mappings.get('domains', {}).get(domain, domain)
-                target_url = f"https://{target_domain}{target_path}"
-                
-                confidence = 0.9  # High confidence for pattern matches
-                reason = f"Pattern match: {source_pattern} → {target_pattern}"
-                
-                logger.debug(f"Pattern match: {original_url} → {target_url} ({confidence})")
-                return target_url, confidence, reason
-                
-            except Exception as e:
-                logger.error(f"Error applying pattern {source_pattern} to {path}: {str(e)}")
-    
-    # No match found
-    return None 
\ No newline at end of file
+    domain = parsed_url.domain
+    path = parsed_url.path
+    original_url = parsed_url.original_url
+
+    if rules is None:
+        rules = compile_pattern_rules(domain_mappings)
+
+    result = rules.match(domain, path, route.pattern_blocks if route else None)
+    if result is None:
+        # No match found
+        return None
+
+    rule, target_path = result
+
+    # Construct the target URL
+    if route is not None:
+        target_domain = route.target_domain if route.mapped else domain
+    else:
+        target_domain = domain_mappings.get('domains', {}).get(domain, domain)
+    target_url = f"https://{target_domain}{target_path}"
+
+    confidence = PATTERN_CONFIDENCE  # High confidence for pattern matches
+
+    logger.debug(f"Pattern match: {original_url} → {target_url} ({confidence})")
+    return target_url, confidence, rule.reason
@@ -1,12 +1,18 @@
 import logging
 from typing import Dict, Any, Optional, Tuple
 
+from utils.url_parser import ParsedURL
+
 logger = logging.getLogger(__name__)
 
+# Highest segment score, reached when every segment is translated
+SEGMENT_MAX_CONFIDENCE = 1.0
+
 def match_by_segment(
-    parsed_url: Dict[str, Any],
+    parsed_url: ParsedURL,
     dictionaries: Dict[str, Dict[str, str]],
-    domain_mappings: Dict[str, Any]
+    domain_mappings: Dict[str, Any],
+    route: Optional[Any] = None
 ) -> Optional[Tuple[str, float, str]]:
     """
     Match URLs by translating path segments using dictionaries.
@@ -15,32 +21,41 @@ def match_by_segment(
         parsed_url: Parsed URL components
         dictionaries: Language-specific word mappings
         domain_mappings: Configuration for domain mappings
+        route: Optional DomainRoute with the dictionary per language and
+            the target domain already resolved
         
     Returns:
         Tuple of (target_url, confidence_score, reason) or None if no match
     """
-    domain = parsed_url['domain']
-    path_segments = parsed_url['path_segments']
-    language_code = parsed_url['language_code']
-    original_url = parsed_url['original_url']
+    domain = parsed_url.domain
+    path_segments = parsed_url.path_segments
+    language_code = parsed_url.language_code
+    original_url = parsed_url.original_url
     
     # Skip if no language code detected or no path segments
     if not language_code or not path_segments:
         return None
     
-    # Determine which dictionary to use based on language code
-    # We'll try xx_en (e.g., fr_en) first, then fallback to just the language code
-    dict_key = f"{language_code}_en"
-    if dict_key not in dictionaries:
-        dict_key = language_code
-        if dict_key not in dictionaries:
+    if route is not None:
+        # The route already resolved xx_en / xx per language
+        dictionary = route.dictionaries.get(language_code)
+        if dictionary is None:
             return None
-    
-    # Get the relevant dictionary
-    dictionary = dictionaries.get(dict_key, {})
-    
-    # Check if we need to map domains
-    target_domain = domain_mappings.get('domains', {}).get(domain, domain)
+        target_domain = route.target_domain if route.mapped else domain
+    else:
+        # Determine which dictionary to use based on language code
+        # We'll try xx_en (e.g., fr_en) first, then fallback to just the language code
+        dict_key = f"{language_code}_en"
+        if dict_key not in dictionaries:
+            dict_key = language_code
+            if dict_key not in dictionaries:
+                return None
+        
+        # Get the relevant dictionary
+        dictionary = dictionaries.get(dict_key, {})
+        
+        # Check if we need to map domains
+        target_domain = domain_mappings.get('domains', {}).get(domain, domain)
     
     # Skip if no domain mapping (nothing to transform)
     if target_domain == domain and not dictionary:
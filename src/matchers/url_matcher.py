@@ -0,0 +1,546 @@
+import contextlib
+import heapq
+import math
+import multiprocessing
+import difflib
+import sys
+from urllib.parse import urlparse
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from utils.target_corpus import TargetCorpus, split_url
+from utils.distance import similarity_above
+from utils.component_scores import DEFAULT_WEIGHTS, EXACT_COMPONENTS
+
+# Standaard statusgrenzen voor de ruwe score
+RELIABLE_THRESHOLD = 0.75
+CHECK_THRESHOLD = 0.45
+
+# Redencodes per resultaat (bitmasker), de tekst volgt pas uit explain_results
+REASON_EXACT = 1
+REASON_DOMAIN_IDENTICAL = 2
+REASON_DOMAIN_SIMILAR = 4
+REASON_SEGMENTS = 8
+REASON_WORDS = 16
+
+# Statussen in volgorde van prioriteit; de positie is de statuscode
+STATUS_LABELS = ("Handmatige controle nodig", "Controle aanbevolen", "Betrouwbaar")
+
+def status_codes(scores, min_confidence=0.0, reliable=RELIABLE_THRESHOLD, check=CHECK_THRESHOLD):
+    """Bepaal de statuscode (index in STATUS_LABELS) voor een reeks ruwe scores.
+
+    Scores onder min_confidence worden altijd gemarkeerd voor handmatige
+    controle. Omdat alleen de opgeslagen scores opnieuw ingedeeld worden, is
+    voor een andere drempel of andere grenzen geen nieuwe matching nodig.
+    """
+    scores = np.asarray(scores, dtype=float)
+    return np.select(
+        [scores < min_confidence, scores >= reliable, scores >= check],
+        [0, 2, 1],
+        default=0
+    ).astype(np.int8)
+
+def assign_status(scores, min_confidence=0.0, reliable=RELIABLE_THRESHOLD, check=CHECK_THRESHOLD):
+    """Bepaal de status als tekst voor een reeks ruwe scores."""
+    return np.asarray(STATUS_LABELS)[status_codes(scores, min_confidence, reliable, check)]
+
+def similarity_ratio(s1, s2):
+    """Berekent de overeenkomst tussen twee strings (0-1)."""
+    return difflib.SequenceMatcher(None, s1, s2).ratio() 
+
+def reason_codes_from_components(components):
+    """Bepaal de redencodes (REASON_* bits) uit scorecomponenten.
+
+    Een component is groter dan nul precies wanneer match_urls de bijbehorende
+    bit zet, dus na herwegen volgen de codes van de nieuwe targets hieruit.
+    """
+    present = np.asarray(components, dtype=float).reshape(-1, 5) > 0
+    bits = np.array([REASON_EXACT, REASON_DOMAIN_IDENTICAL, REASON_DOMAIN_SIMILAR,
+                     REASON_SEGMENTS, REASON_WORDS], dtype=np.uint8)
+    return (present * bits).sum(axis=1).astype(np.uint8)
+
+def _format_count(value):
+    """Toon een (fuzzy) aantal als geheel getal wanneer het er een is."""
+    if abs(value - round(value)) < 1e-9:
+        return str(int(round(value)))
+    return f"{value:.2f}"
+
+def _segment_matches(source_segments, target_segments):
+    """Tel de overeenkomende segmenten van twee paden, met een regel per segment."""
+    matching_segments = 0
+    segment_details = []
+    for i, (source_seg, target_seg) in enumerate(zip(source_segments, target_segments)):
+        if source_seg == target_seg:
+            matching_segments += 1
+            segment_details.append(f"Segment {i+1}: Exacte match '{source_seg}'")
+        else:
+            seg_similarity = similarity_above(source_seg, target_seg, 0.7)
+            if seg_similarity > 0.7:
+                matching_segments += seg_similarity
+                segment_details.append(f"Segment {i+1}: Fuzzy match '{source_seg}' ~ '{target_seg}' ({int(seg_similarity*100)}%)")
+    return matching_segments, segment_details
+
+def explain_match(source_url, target_url, weights=DEFAULT_WEIGHTS):
+    """Scoor één los paar opnieuw en lever (reden, details).
+
+    Voor paren zonder opgeslagen resultaat, zoals in de kwaliteitstest;
+    resultaten van match_urls worden met explain_results uitgelegd. weights
+    volgt de volgorde van COMPONENT_NAMES.
+    """
+    if not target_url:
+        return "Geen match gevonden", ""
+    if source_url == target_url:
+        return "Exacte URL match", "100% exacte match tussen source en target URL"
+    
+    source_netloc, _, source_segments, source_words = split_url(source_url)
+    target_netloc, _, target_segments, target_words = split_url(target_url)
+    confidence = 0
+    reason = []
+    
+    # Domein
+    if source_netloc == target_netloc:
+        confidence += weights[1]
+        reason.append("Identiek domein")
+        domain_part = "Identiek domein: " + source_netloc
+    else:
+        domain_similarity = similarity_above(source_netloc, target_netloc, 0.7)
+        if domain_similarity > 0.7:
+            confidence += weights[2] * domain_similarity
+            reason.append(f"Vergelijkbaar domein ({int(domain_similarity*100)}%)")
+            domain_part = f"Vergelijkbaar domein: {source_netloc} ~ {target_netloc} ({int(domain_similarity*100)}%)"
+        else:
+            domain_part = f"Verschillende domeinen: {source_netloc} ≠ {target_netloc}"
+    
+    # Segmenten
+    segment_details = []
+    if source_segments and target_segments:
+        matching_segments, segment_details = _segment_matches(source_segments, target_segments)
+        segment_confidence = matching_segments / max(len(source_segments), len(target_segments))
+        confidence += weights[3] * segment_confidence
+        if matching_segments > 0:
+            reason.append(f"{matching_segments} exacte matches, Jaccard similarity: {int(segment_confidence*100)}%")
+    
+    # Woorden
+    word_part = "Geen woorden om te vergelijken"
+    if source_words and target_words:
+        common_words = len(source_words & target_words)
+        word_similarity = common_words / (len(source_words) + len(target_words) - common_words)
+        if word_similarity > 0.3:
+            confidence += weights[4] * word_similarity
+            reason.append(f"Woordgelijkheid: {int(word_similarity*100)}%")
+            word_part = f"Woordgelijkheid: {int(word_similarity*100)}% ({common_words} overeenkomende woorden)"
+        else:
+            word_part = "Weinig overeenkomende woorden"
+    
+    segment_part = "\n".join(segment_details) if segment_details else "Geen overeenkomende segmenten"
+    details = f"{domain_part}\n{segment_part}\n{word_part}\nTotale score: {int(confidence*100)}%"
+    return ", ".join(reason) if reason else "Geen match gevonden", details
+
+def explain_results(match_results, positions=None, segment_details=False):
+    """Reden en details voor rijen van een MatchResults, als twee lijsten.
+
+    De tekst volgt uit de opgeslagen redencodes en de scorecomponenten van het
+    gekozen target; er wordt niets opnieuw gescoord. Alleen met
+    segment_details worden de paden nog gesplitst voor een regel per segment,
+    bedoeld voor de rijen die getoond of geëxporteerd worden. Anders bevatten
+    de details een samenvatting van het aantal overeenkomende segmenten.
+
+    Args:
+        match_results: MatchResults uit match_urls met component_k > 0
+        positions: Optionele rijposities, standaard alle rijen
+        segment_details: Toon per segment of het overeenkomt
+    """
+    if match_results.components is None or match_results.target_word_counts is None:
+        raise ValueError("explain_results heeft scorecomponenten nodig, match met component_k > 0")
+    if positions is None:
+        positions = range(len(match_results))
+
+    reasons = []
+    details = []
+    for pos in positions:
+        source_url = match_results.source_urls[pos]
+        target_id = int(match_results.target_idx[pos])
+        code = int(match_results.reason_codes[pos])
+        if target_id < 0:
+            reasons.append("Geen match gevonden")
+            details.append("")
+            continue
+        if code & REASON_EXACT:
+            reasons.append("Exacte URL match")
+            details.append("100% exacte match tussen source en target URL")
+            continue
+
+        _, _, domain_similarity, segment_confidence, word_similarity = match_results.components[pos]
+        target_url = match_results.target_urls[target_id]
+        target_netloc = urlparse(target_url).netloc
+        reason = []
+
+        # Domein
+        if code & REASON_DOMAIN_IDENTICAL:
+            reason.append("Identiek domein")
+            domain_part = "Identiek domein: " + target_netloc
+        else:
+            source_netloc = urlparse(source_url).netloc
+            if code & REASON_DOMAIN_SIMILAR:
+                reason.append(f"Vergelijkbaar domein ({int(domain_similarity*100)}%)")
+                domain_part = f"Vergelijkbaar domein: {source_netloc} ~ {target_netloc} ({int(domain_similarity*100)}%)"
+            else:
+                domain_part = f"Verschillende domeinen: {source_netloc} ≠ {target_netloc}"
+
+        # Segmenten
+        segment_total = max(int(match_results.source_segment_counts[pos]),
+                            int(match_results.target_segment_counts[target_id]))
+        matching_segments = segment_confidence * segment_total
+        segment_part = "Geen overeenkomende segmenten"
+        if code & REASON_SEGMENTS:
+            reason.append(f"{_format_count(matching_segments)} exacte matches, Jaccard similarity: {int(segment_confidence*100)}%")
+            if segment_details:
+                source_segments = split_url(source_url)[2]
+                target_segments = split_url(target_url)[2]
+                segment_part = "\n".join(_segment_matches(source_segments, target_segments)[1])
+            else:
+                segment_part = (f"{_format_count(matching_segments)} van {segment_total} segmenten "
+                                f"overeenkomend ({int(segment_confidence*100)}%)")
+
+        # Woorden
+        source_word_count = int(match_results.source_word_counts[pos])
+        target_word_count = int(match_results.target_word_counts[target_id])
+        if code & REASON_WORDS:
+            common_words = round(word_similarity * (source_word_count + target_word_count) / (1 + word_similarity))
+            reason.append(f"Woordgelijkheid: {int(word_similarity*100)}%")
+            word_part = f"Woordgelijkheid: {int(word_similarity*100)}% ({common_words} overeenkomende woorden)"
+        elif source_word_count and target_word_count:
+            word_part = "Weinig overeenkomende woorden"
+        else:
+            word_part = "Geen woorden om te vergelijken"
+
+        score = float(match_results.scores[pos])
+        reasons.append(", ".join(reason) if reason else "Geen match gevonden")
+        details.append(f"{domain_part}\n{segment_part}\n{word_part}\nTotale score: {int(score*100)}%")
+    return reasons, details
+
+def match_urls(source_urls, target_urls, min_confidence=0.5,
+               use_index=True, fallback_to_all=True, top_k=1, prune=True,
+               strict_min_confidence=False, stats=None, component_k=0):
+    """Match source URLs met target URLs op basis van verschillende criteria.
+
+    target_urls mag een lijst URLs of een TargetCorpus zijn; een corpus wordt
+    maar één keer geparsed en kan hergebruikt worden. Met use_index worden
+    alleen de targets gescoord die minstens één padsegment of woord delen met
+    de source URL. Heeft een source geen overlap met enig target, dan worden
+    met fallback_to_all alsnog alle targets gescoord.
+
+    Met top_k > 1 houdt een heap van grootte k per source de k beste targets
+    bij; die staan als (url, score) paren in 'Top kandidaten'.
+
+    Met prune wordt per target eerst een goedkope bovengrens van de score
+    berekend (domein, aantal segmenten, aantal woorden). Targets die de huidige
+    beste (of de k-de beste) niet kunnen verslaan worden overgeslagen; het
+    resultaat blijft gelijk. Met strict_min_confidence vallen ook targets onder
+    min_confidence af, waardoor zwakke rijen geen target meer krijgen. Een
+    meegegeven stats dict wordt opgehoogd met 'candidates' en 'pruned'.
+
+    Met component_k > 0 krijgt elke rij onder 'Componenten' de losse
+    scorecomponenten (zie COMPONENT_NAMES) van de max(top_k, component_k)
+    beste kandidaten als (target_id, componenten) paren. ComponentScores maakt
+    daar NumPy arrays van om achteraf te herwegen en opnieuw te rangschikken;
+    dat kan alleen tussen de bewaarde kandidaten.
+
+    'Target id' is de positie van de beste target in het corpus (-1 zonder
+    match), 'Top kandidaat ids' die van de kandidaten. Per rij worden alleen
+    de ruwe score en een 'Reden code' (REASON_* bits) bewaard, met het aantal
+    'Bron segmenten' en 'Bron woorden'; explain_results maakt daaruit en uit de
+    componenten de leesbare reden en details wanneer een rij getoond of
+    geëxporteerd wordt.
+    """
+    results = []
+    candidates_seen = 0
+    pruned = 0
+    min_floor = min_confidence if strict_min_confidence else 0
+    # Aantal kandidaten per source in de heap
+    keep_k = max(top_k, component_k)
+    
+    # Parse de targets één keer per corpus
+    corpus = target_urls if isinstance(target_urls, TargetCorpus) else TargetCorpus(target_urls)
+    target_index = corpus.index if use_index else None
+    all_targets = range(len(corpus))
+    
+    for source_url in source_urls:
+        best_match = None
+        best_target_id = None
+        best_components = None
+        best_confidence = 0
+        best_reason = 0
+        top_heap = []  # min-heap van (score, -target_id, componenten)
+        
+        # Parse de source URL
+        source_netloc, source_path, source_segments, source_words = split_url(source_url)
+        source_netloc_len = len(source_netloc)
+        source_segment_count = len(source_segments)
+        source_word_count = len(source_words)
+        
+        # Bepaal welke targets gescoord moeten worden
+        if use_index:
+            candidate_ids = target_index.candidates(source_url)
+            if not candidate_ids and fallback_to_all:
+                candidate_ids = all_targets
+            exact_id = target_index.exact.get(source_url)
+            if exact_id is not None:
+                candidate_ids = [exact_id]
+        else:
+            candidate_ids = all_targets
+        
+        for target_id in candidate_ids:
+            target_url = corpus.urls[target_id]
+            target_netloc = corpus.netlocs[target_id]
+            target_segments = corpus.segments[target_id]
+            target_words = corpus.words[target_id]
+            candidates_seen += 1
+            
+            confidence = 0
+            
+            # Woordgelijkheid is goedkoop (set operaties) en telt exact mee in de bovengrens
+            word_similarity = 0
+            if source_words and target_words:
+                common_words = len(source_words & target_words)
+                word_similarity = common_words / (source_word_count + len(target_words) - common_words)
+            
+            # Bovengrens van de score zonder similarity_ratio aanroepen
+            if prune and source_url != target_url:
+                if keep_k > 1:
+                    floor = top_heap[0][0] if len(top_heap) == keep_k else 0
+                else:
+                    floor = best_confidence
+                floor = max(floor, min_floor)
+                
+                if source_netloc == target_netloc:
+                    bound = 0.3
+                else:
+                    # real_quick_ratio: 2 * kortste lengte / totale lengte
+                    total_len = source_netloc_len + len(target_netloc)
+                    netloc_bound = 2 * min(source_netloc_len, len(target_netloc)) / total_len if total_len else 0
+                    bound = 0.2 * netloc_bound if netloc_bound > 0.7 else 0
+                if source_segments and target_segments:
+                    # Per segment: 1 bij gelijkheid, anders de lengte-bovengrens als die > 0.7 is
+                    segment_bound = 0
+                    for source_seg, target_seg in zip(source_segments, target_segments):
+                        if source_seg == target_seg:
+                            segment_bound += 1
+                        else:
+                            seg_len_bound = 2 * min(len(source_seg), len(target_seg)) / (len(source_seg) + len(target_seg))
+                            if seg_len_bound > 0.7:
+                                segment_bound += seg_len_bound
+                    bound += 0.5 * segment_bound / max(source_segment_count, len(target_segments))
+                if word_similarity > 0.3:
+                    bound += 0.2 * word_similarity
+                
+                # Kleine marge tegen afrondingsverschillen in de optelling
+                if bound < floor - 1e-9:
+                    pruned += 1
+                    continue
+            
+            # Controleer op exacte match
+            if source_url == target_url:
+                confidence = 1.0
+                best_match = target_url
+                best_target_id = target_id
+                best_components = EXACT_COMPONENTS
+                best_confidence = confidence
+                best_reason = REASON_EXACT
+                top_heap = [(confidence, -target_id, EXACT_COMPONENTS)]
+                break
+            
+            # Controleer op domein match
+            reason_code = 0
+            domain_exact = 0.0
+            domain_component = 0.0
+            if source_netloc == target_netloc:
+                domain_exact = 1.0
+                confidence += 0.3
+                reason_code |= REASON_DOMAIN_IDENTICAL
+            else:
+                domain_similarity = similarity_above(source_netloc, target_netloc, 0.7)
+                if domain_similarity > 0.7:
+                    domain_component = domain_similarity
+                    confidence += 0.2 * domain_similarity
+                    reason_code |= REASON_DOMAIN_SIMILAR
+            
+            # Controleer segmenten
+            matching_segments = 0
+            segment_confidence = 0.0
+            
+            # Als beide URLs segmenten hebben
+            if source_segments and target_segments:
+                for i, source_seg in enumerate(source_segments):
+                    if i < len(target_segments):
+                        if source_seg == target_segments[i]:
+                            matching_segments += 1
+                        else:
+                            # Controleer op fuzzy match
+                            seg_similarity = similarity_above(source_seg, target_segments[i], 0.7)
+                            if seg_similarity > 0.7:
+                                matching_segments += seg_similarity
+                
+                # Bereken segment confidence
+                segment_confidence = matching_segments / max(source_segment_count, len(target_segments))
+                confidence += 0.5 * segment_confidence
+                if matching_segments > 0:
+                    reason_code |= REASON_SEGMENTS
+                
+            # Controleer op woordgelijkheid
+            word_component = 0.0
+            if word_similarity > 0.3:
+                word_component = word_similarity
+                confidence += 0.2 * word_similarity
+                reason_code |= REASON_WORDS
+                
+            components = (0.0, domain_exact, domain_component, segment_confidence, word_component)
+            
+            # Houd de k beste kandidaten bij; bij gelijke score wint het eerste target
+            if keep_k > 1 and confidence > 0:
+                if len(top_heap) < keep_k:
+                    heapq.heappush(top_heap, (confidence, -target_id, components))
+                elif (confidence, -target_id) > top_heap[0][:2]:
+                    heapq.heapreplace(top_heap, (confidence, -target_id, components))
+            
+            # Update beste match als deze beter is; de uitleg volgt pas bij weergave
+            if confidence > best_confidence:
+                best_match = target_url
+                best_target_id = target_id
+                best_components = components
+                best_confidence = confidence
+                best_reason = reason_code
+        
+        # Voeg resultaat toe aan lijst; status en uitleg volgen later uit de ruwe waarden
+        results.append({
+            'Source URL': source_url,
+            'Target URL': best_match if best_match else "",
+            'Target id': best_target_id if best_match is not None else -1,
+            'Score': best_confidence,
+            'Reden code': best_reason,
+            'Bron segmenten': source_segment_count,
+            'Bron woorden': source_word_count,
+            'Match gevonden': best_match is not None
+        })
+        
+        if top_k > 1:
+            top = sorted(top_heap, reverse=True)[:top_k]
+            results[-1]['Top kandidaten'] = [(corpus.urls[-neg_id], round(score, 2)) for score, neg_id, _ in top]
+            results[-1]['Top kandidaat ids'] = [-neg_id for _, neg_id, _ in top]
+        
+        if component_k:
+            if keep_k > 1:
+                results[-1]['Componenten'] = [
+                    (-neg_id, components) for _, neg_id, components in sorted(top_heap, reverse=True)
+                ]
+            else:
+                results[-1]['Componenten'] = [] if best_match is None else [(best_target_id, best_components)]
+    
+    if stats is not None:
+        stats['candidates'] = stats.get('candidates', 0) + candidates_seen
+        stats['pruned'] = stats.get('pruned', 0) + pruned
+    
+    return results
+
+
+# Target data per worker proces, gezet door _init_worker
+_worker_corpus = None
+_worker_options = {}
+
+def _init_worker(target_urls, max_df, options):
+    """Parse het target corpus één keer per worker proces."""
+    global _worker_corpus, _worker_options
+    _worker_corpus = TargetCorpus(target_urls, max_df=max_df)
+    _worker_options = options
+
+def _match_chunk(source_chunk):
+    """Match één chunk source URLs tegen het corpus van deze worker."""
+    chunk_stats = {}
+    results = match_urls(source_chunk, _worker_corpus, stats=chunk_stats, **_worker_options)
+    return results, chunk_stats
+
+@contextlib.contextmanager
+def _hide_main_module():
+    """Verberg het hoofdscript voor spawn, zodat workers het niet opnieuw uitvoeren.
+
+    Onder streamlit run wijst __main__.__file__ naar het UI script; spawn zou
+    dat in elke worker als __mp_main__ draaien. De workers hebben alleen deze
+    module nodig.
+    """
+    main_module = sys.modules['__main__']
+    saved = {name: main_module.__dict__[name] for name in ('__file__', '__spec__') if name in main_module.__dict__}
+    main_module.__dict__.pop('__file__', None)
+    main_module.__spec__ = None
+    try:
+        yield
+    finally:
+        main_module.__dict__.pop('__spec__', None)
+        main_module.__dict__.update(saved)
+
+def iter_match_urls(source_urls, target_urls, workers=1, chunk_size=None, stats=None, **options):
+    """Match source URLs per chunk en geef de resultaten per chunk terug.
+
+    Generator-variant van match_urls: elke yield is de lijst resultaten van
+    één chunk source URLs, in de oorspronkelijke volgorde. Met workers > 1
+    worden de chunks in een ProcessPoolExecutor gescoord; elke worker
+    parseert de targets één keer. Overige keyword argumenten worden aan
+    match_urls doorgegeven.
+    """
+    source_urls = list(source_urls)
+    workers = workers or multiprocessing.cpu_count()
+    
+    if chunk_size is None:
+        if workers > 1:
+            # Een paar chunks per worker houdt de belasting gelijk bij ongelijke chunks
+            chunk_size = max(1, math.ceil(len(source_urls) / (workers * 4)))
+        else:
+            # Serieel: ongeveer honderd voortgangsstappen
+            chunk_size = max(1, math.ceil(len(source_urls) / 100))
+    chunks = [source_urls[i:i + chunk_size] for i in range(0, len(source_urls), chunk_size)]
+    
+    # Eén worker of één chunk: geen procesopstart nodig
+    if workers <= 1 or len(chunks) <= 1:
+        corpus = target_urls if isinstance(target_urls, TargetCorpus) else TargetCorpus(target_urls)
+        for chunk in chunks:
+            yield match_urls(chunk, corpus, stats=stats, **options)
+        return
+    
+    if isinstance(target_urls, TargetCorpus):
+        corpus_urls, max_df = target_urls.urls, target_urls.max_df
+    else:
+        corpus_urls, max_df = list(target_urls), None
+    
+    # spawn in plaats van fork: veilig vanuit het (multi-threaded) Streamlit proces
+    executor = ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)),
+        mp_context=multiprocessing.get_context('spawn'),
+        initializer=_init_worker,
+        initargs=(corpus_urls, max_df, options)
+    )
+    try:
+        # map dient alle chunks direct in, dus alle workers starten binnen dit blok
+        with _hide_main_module():
+            chunk_iter = executor.map(_match_chunk, chunks)
+        for chunk_results, chunk_stats in chunk_iter:
+            if stats is not None:
+                for key, value in chunk_stats.items():
+                    stats[key] = stats.get(key, 0) + value
+            yield chunk_results
+    finally:
+        # Bij afbreken (bijv. een Streamlit rerun) geen openstaande chunks meer starten
+        executor.shutdown(wait=True, cancel_futures=True)
+
+def match_urls_parallel(source_urls, target_urls, workers=None, chunk_size=None, stats=None, **options):
+    """Match source URLs parallel in een ProcessPoolExecutor.
+
+    De source URLs worden in chunks verdeeld; elke worker parseert de targets
+    één keer. Chunks worden in volgorde samengevoegd, dus het resultaat is
+    identiek aan match_urls ongeacht het aantal workers. Overige keyword
+    argumenten worden aan match_urls doorgegeven.
+    """
+    results = []
+    for chunk_results in iter_match_urls(source_urls, target_urls, workers=workers,
+                                         chunk_size=chunk_size, stats=stats, **options):
+        results.extend(chunk_results)
+    return results
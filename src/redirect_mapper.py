@@ -1,17 +1,24 @@
 import os
+from functools import lru_cache
+import numpy as np
 import pandas as pd
 from urllib.parse import urlparse, parse_qs
 import json
 import logging
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Callable, Dict, Iterator, List, Tuple, Optional, Any
 
 from utils.url_parser import parse_url, normalize_url
 from utils.confidence_calculator import calculate_confidence
-from utils.export import export_to_csv, export_to_htaccess
-from matchers.pattern_matcher import match_by_pattern
-from matchers.fuzzy_matcher import fuzzy_match
-from matchers.segment_matcher import match_by_segment
-from matchers.language_matcher import match_by_language
+from utils.export import (
+    export_to_csv, export_to_htaccess,
+    write_csv_rows, write_htaccess_header, write_htaccess_rules
+)
+from matchers.pattern_matcher import match_by_pattern, compile_pattern_rules, PATTERN_CONFIDENCE
+from matchers.fuzzy_matcher import fuzzy_match, FUZZY_MAX_CONFIDENCE
+from matchers.segment_matcher import match_by_segment, SEGMENT_MAX_CONFIDENCE
+from matchers.language_matcher import match_by_language, LANGUAGE_CONFIDENCE
+from matchers.dispatch import build_domain_routes
+from matchers.cascade import MatcherCascade, MatcherStage
 
 # Set up logging
 logging.basicConfig(
@@ -33,6 +40,14 @@ class RedirectMapper:
         self.domain_mappings = self._load_config('domains.json')
         self.language_config = self._load_config('languages.json')
         self.dictionaries = self._load_dictionaries()
+        self.pattern_rules = compile_pattern_rules(self.domain_mappings)
+        self.routes, self.default_route = build_domain_routes(
+            self.domain_mappings,
+            self.language_config,
+            self.dictionaries,
+            self.pattern_rules
+        )
+        self.cascade = self._build_cascade()
         logger.info("RedirectMapper initialized with configurations")
     
     def _load_config(self, filename: str) -> Dict:
@@ -84,22 +99,7 @@ class RedirectMapper:
             else:
                 raise ValueError(f"Unsupported file format: {file_ext}")
                 
-            # Validate required columns
-            if source_col not in df.columns:
-                raise ValueError(f"Source column '{source_col}' not found in the input file")
-                
-            # If target column is specified but not present, add an empty one
-            if target_col and target_col not in df.columns:
-                df[target_col] = None
-                
-            # Add columns for results if they don't exist
-            if 'suggested_target' not in df.columns:
-                df['suggested_target'] = None
-            if 'confidence_score' not in df.columns:
-                df['confidence_score'] = 0.0
-            if 'matching_reason' not in df.columns:
-                df['matching_reason'] = None
-                
+            df = self._prepare_frame(df, source_col, target_col)
             logger.info(f"Successfully loaded {len(df)} URLs from {input_file}")
             return df
             
@@ -107,6 +107,148 @@ class RedirectMapper:
             logger.error(f"Error loading data from {input_file}: {str(e)}")
             raise
     
+    def _prepare_frame(self, df: pd.DataFrame, source_col: str,
+                       target_col: Optional[str]) -> pd.DataFrame:
+        """Validate the input columns and add the result columns."""
+        # Validate required columns
+        if source_col not in df.columns:
+            raise ValueError(f"Source column '{source_col}' not found in the input file")
+            
+        # If target column is specified but not present, add an empty one
+        if target_col and target_col not in df.columns:
+            df[target_col] = None
+            
+        # Add columns for results if they don't exist
+        if 'suggested_target' not in df.columns:
+            df['suggested_target'] = None
+        if 'confidence_score' not in df.columns:
+            df['confidence_score'] = 0.0
+        if 'matching_reason' not in df.columns:
+            df['matching_reason'] = None
+        
+        return df
+    
+    def _chunk_dtypes(self, input_file: str, source_col: str, chunk_size: int,
+                      **kwargs) -> Dict[str, str]:
+        """Find the dtypes a single read_csv call would give columns that vary per chunk.
+        
+        A column can be int64 in one chunk and float64 in the next (because
+        of empty cells), which changes how its values are written. This pass
+        parses every column except the source URLs and returns the dtype to
+        force for such columns: float64 for numbers, str for anything else.
+        
+        Args:
+            input_file: Path to the CSV file
+            source_col: Column name for source URLs, skipped in this pass
+            chunk_size: Number of rows per chunk
+            **kwargs: Additional arguments to pass to pandas.read_csv
+            
+        Returns:
+            Dtype per column that needs one
+        """
+        kinds: Dict[str, set] = {}
+        reader = pd.read_csv(input_file, chunksize=chunk_size,
+                             usecols=lambda column: column != source_col, **kwargs)
+        with reader:
+            for chunk in reader:
+                for column, dtype in chunk.dtypes.items():
+                    kinds.setdefault(column, set()).add(dtype)
+        
+        dtypes = {}
+        for column, column_dtypes in kinds.items():
+            if len(column_dtypes) > 1:
+                numeric = all(pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype)
+                              for dtype in column_dtypes)
+                dtypes[column] = 'float64' if numeric else 'str'
+        return dtypes
+    
+    def iter_chunks(self, input_file: str, source_col: str = "source_url",
+                    target_col: Optional[str] = None, chunk_size: int = 100000,
+                    **kwargs) -> Iterator[pd.DataFrame]:
+        """Load a CSV file in chunks of rows, each prepared like load_data.
+        
+        Args:
+            input_file: Path to the CSV file
+            source_col: Column name for source URLs
+            target_col: Optional column name for target URLs (for training or verification)
+            chunk_size: Number of rows per chunk
+            **kwargs: Additional arguments to pass to pandas.read_csv. An
+                explicit dtype skips the pass over the file that otherwise
+                determines the dtypes of columns that vary per chunk
+            
+        Yields:
+            DataFrame per chunk, with the index running on across chunks
+        """
+        file_ext = os.path.splitext(input_file)[1].lower()
+        if file_ext != '.csv':
+            raise ValueError(f"Chunked reading is only supported for CSV files, not {file_ext}")
+        
+        if 'dtype' not in kwargs:
+            kwargs['dtype'] = self._chunk_dtypes(input_file, source_col, chunk_size, **kwargs) or None
+        with pd.read_csv(input_file, chunksize=chunk_size, **kwargs) as reader:
+            for chunk in reader:
+                yield self._prepare_frame(chunk, source_col, target_col)
+    
+    def _build_cascade(self) -> MatcherCascade:
+        """Set up the matching strategies in priority order with their confidence ceilings."""
+        return MatcherCascade([
+            # 1. Domain and language-based matching
+            MatcherStage(
+                'language', LANGUAGE_CONFIDENCE,
+                lambda parsed_url, route: match_by_language(
+                    parsed_url, self.domain_mappings, self.language_config, route=route
+                ),
+                lambda route: route.use_language
+            ),
+            # 2. Pattern-based matching
+            MatcherStage(
+                'pattern', PATTERN_CONFIDENCE,
+                lambda parsed_url, route: match_by_pattern(
+                    parsed_url, self.domain_mappings, self.pattern_rules, route=route
+                ),
+                lambda route: route.use_pattern
+            ),
+            # 3. Segment-based matching using dictionaries
+            MatcherStage(
+                'segment', SEGMENT_MAX_CONFIDENCE,
+                lambda parsed_url, route: match_by_segment(
+                    parsed_url, self.dictionaries, self.domain_mappings, route=route
+                ),
+                lambda route: route.use_segment
+            ),
+            # 4. Fuzzy matching, only useful while nothing scores its ceiling yet
+            MatcherStage(
+                'fuzzy', FUZZY_MAX_CONFIDENCE,
+                lambda parsed_url, route: fuzzy_match(parsed_url, self.domain_mappings, route=route),
+                lambda route: route.use_fuzzy
+            ),
+        ])
+    
+    def _match_url(self, source_url: str,
+                   confidence_threshold: float = 0.0) -> Optional[Tuple[str, float, str]]:
+        """Run the matching strategies for one URL and return the best match.
+        
+        Args:
+            source_url: The source URL to match
+            confidence_threshold: Matchers that cannot reach this confidence are skipped
+            
+        Returns:
+            Tuple of (target_url, confidence_score, reason) or None if no match
+        """
+        # Parse the URL to get components
+        parsed_url = parse_url(source_url)
+        if not parsed_url:
+            logger.warning(f"Could not parse URL: {source_url}")
+            return None
+        
+        # One lookup decides which matchers can apply to this domain
+        route = self.routes.get(parsed_url.domain, self.default_route)
+        if route is None:
+            return None
+        
+        # Strongest matchers first; stop once the rest cannot win
+        return self.cascade.match(parsed_url, route, confidence_threshold)
+    
     def process_urls(self, df: pd.DataFrame, source_col: str = "source_url",
                     target_col: str = "suggested_target", 
                     confidence_threshold: float = 0.0) -> pd.DataFrame:
@@ -121,65 +263,108 @@ class RedirectMapper:
         Returns:
             DataFrame with processed mappings
         """
-        results = []
+        self.cascade.reset_stats()
+        df = self._match_frame(df, source_col, target_col, confidence_threshold)
         
-        for idx, row in df.iterrows():
-            source_url = row[source_col]
-            
-            if not source_url or pd.isna(source_url):
-                continue
-                
-            # Parse the URL to get components
-            parsed_url = parse_url(source_url)
-            if not parsed_url:
-                logger.warning(f"Could not parse URL: {source_url}")
+        logger.info(f"Processed {len(df)} URLs with confidence threshold {confidence_threshold}")
+        self.cascade.log_stats()
+        return df
+    
+    def _match_frame(self, df: pd.DataFrame, source_col: str, target_col: str,
+                     confidence_threshold: float,
+                     match_url: Optional[Callable[[str, float], Optional[Tuple[str, float, str]]]] = None) -> pd.DataFrame:
+        """Match the source URLs of a DataFrame and write the results into it.
+        
+        match_url replaces _match_url, e.g. with a cached version that is
+        shared between chunks.
+        """
+        if match_url is None:
+            match_url = self._match_url
+        
+        # Parse and match every distinct source URL once
+        codes, unique_urls = pd.factorize(df[source_col])
+        matched = np.zeros(len(unique_urls), dtype=bool)
+        targets = np.empty(len(unique_urls), dtype=object)
+        confidences = np.zeros(len(unique_urls), dtype=float)
+        reasons = np.empty(len(unique_urls), dtype=object)
+        
+        for i, source_url in enumerate(unique_urls):
+            if not source_url:
                 continue
             
-            # Try different matching strategies
-            matches = []
-            
-            # 1. Try domain and language-based matching
-            domain_match = match_by_language(
-                parsed_url, 
-                self.domain_mappings, 
-                self.language_config
-            )
-            if domain_match:
-                matches.append(domain_match)
-            
-            # 2. Try pattern-based matching
-            pattern_match = match_by_pattern(parsed_url, self.domain_mappings)
-            if pattern_match:
-                matches.append(pattern_match)
-            
-            # 3. Try segment-based matching using dictionaries
-            segment_match = match_by_segment(
-                parsed_url, 
-                self.dictionaries, 
-                self.domain_mappings
-            )
-            if segment_match:
-                matches.append(segment_match)
-            
-            # 4. Try fuzzy matching if other methods didn't yield high confidence
-            if not matches or max(m[1] for m in matches) < 0.8:
-                fuzzy = fuzzy_match(parsed_url, self.domain_mappings)
-                if fuzzy:
-                    matches.append(fuzzy)
+            best_match = match_url(source_url, confidence_threshold)
+            if best_match and best_match[1] >= confidence_threshold:
+                targets[i], confidences[i], reasons[i] = best_match
+                matched[i] = True
+        
+        # Write the results back as whole columns; rows without a match keep their values
+        rows = codes >= 0
+        rows[rows] = matched[codes[rows]]
+        if rows.any():
+            row_codes = codes[rows]
+            df.loc[rows, target_col] = targets[row_codes]
+            df.loc[rows, 'confidence_score'] = confidences[row_codes]
+            df.loc[rows, 'matching_reason'] = reasons[row_codes]
+        
+        return df
+    
+    def process_file(self, input_file: str, output_file: str,
+                     format_type: str = 'csv', source_col: str = "source_url",
+                     target_col: Optional[str] = None,
+                     confidence_threshold: float = 0.0,
+                     chunk_size: int = 100000, **kwargs) -> int:
+        """Process a CSV file chunk by chunk, appending the results to the output file.
+        
+        Memory use depends on the chunk size instead of the file size. The
+        output is the same as load_data, process_urls and export_results
+        on the whole file. To get there, the file is first read once to
+        find columns whose dtype varies per chunk, unless dtype is given.
+        
+        Args:
+            input_file: Path to the input CSV file
+            output_file: Path to the output file
+            format_type: Format type ('csv' or 'htaccess')
+            source_col: Column name for source URLs
+            target_col: Optional column name for target URLs (for training or verification)
+            confidence_threshold: Minimum confidence score to include a mapping
+            chunk_size: Number of rows per chunk
+            **kwargs: Additional arguments to pass to pandas.read_csv, e.g.
+                dtype to skip the dtype pass
             
-            # Choose the best match based on confidence score
-            if matches:
-                matches.sort(key=lambda x: x[1], reverse=True)
-                best_match = matches[0]
-                target_url, confidence, reason = best_match
-                
-                if confidence >= confidence_threshold:
-                    df.at[idx, target_col] = target_url
-                    df.at[idx, 'confidence_score'] = confidence
-                    df.at[idx, 'matching_reason'] = reason
+        Returns:
+            Number of processed rows
+        """
+        format_type = format_type.lower()
+        if format_type not in ('csv', 'htaccess'):
+            raise ValueError(f"Unsupported export format: {format_type}")
+        
+        self.cascade.reset_stats()
+        rows = 0
+        redirects = 0
+        
+        # URLs that repeat across chunks are matched once, with memory bounded by the cache size
+        match_url = lru_cache(maxsize=chunk_size)(self._match_url)
+        
+        # newline='' so the CSV rows are written exactly as export_to_csv writes them
+        with open(output_file, 'w', encoding='utf-8', newline='' if format_type == 'csv' else None) as f:
+            if format_type == 'htaccess':
+                write_htaccess_header(f)
             
-        logger.info(f"Processed {len(df)} URLs with confidence threshold {confidence_threshold}")
-        return df
+            for i, chunk in enumerate(self.iter_chunks(input_file, source_col, target_col, chunk_size, **kwargs)):
+                chunk = self._match_frame(chunk, source_col, "suggested_target", confidence_threshold, match_url)
+                if format_type == 'csv':
+                    write_csv_rows(chunk, f, header=(i == 0))
+                else:
+                    redirects += write_htaccess_rules(chunk, f, source_col=source_col)
+                rows += len(chunk)
+                logger.info(f"Processed {rows} URLs from {input_file}")
+        
+        logger.info(f"Processed {rows} URLs with confidence threshold {confidence_threshold}")
+        self.cascade.log_stats()
+        if format_type == 'htaccess':
+            logger.info(f"Exported {redirects} redirects to .htaccess file: {output_file}")
+        logger.info(f"Successfully exported results to {output_file} in {format_type} format")
+        return rows
     
     def export_results(self, df: pd.DataFrame, output_file: str,
                       format_type: str = 'csv') -> None:
@@ -0,0 +1,134 @@
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+# Score components per candidate and their default weights:
+# total score = sum of weight * component
+COMPONENT_NAMES = ('exact', 'domain_exact', 'domain_similarity', 'segments', 'words')
+DEFAULT_WEIGHTS = (1.0, 0.3, 0.2, 0.5, 0.2)
+EXACT_COMPONENTS = (1.0, 0.0, 0.0, 0.0, 0.0)
+
+class ComponentScores:
+    """Component scores of the kept candidates of a finished match run.
+
+    One row per (source, candidate target) pair, so re-weighting and
+    re-ranking is a matrix-vector product plus a sort instead of a new
+    N x M match.
+    """
+
+    def __init__(self, source_idx: np.ndarray, target_idx: np.ndarray,
+                 components: np.ndarray, n_sources: int):
+        """Wrap existing arrays.
+
+        Args:
+            source_idx: Source position per candidate row (rows of one
+                source are grouped; unsorted input is sorted once)
+            target_idx: Target corpus position per candidate row
+            components: Matrix of shape (rows, len(COMPONENT_NAMES))
+            n_sources: Number of sources in the run
+        """
+        # Rows have to be grouped per source for the reduceat calls in rerank
+        if len(source_idx) > 1 and np.any(source_idx[1:] < source_idx[:-1]):
+            order = np.argsort(source_idx, kind='stable')
+            source_idx, target_idx, components = source_idx[order], target_idx[order], components[order]
+
+        self.source_idx = source_idx
+        self.target_idx = target_idx
+        self.components = components
+        self.n_sources = n_sources
+        self._starts = np.flatnonzero(np.r_[True, source_idx[1:] != source_idx[:-1]]) if len(source_idx) else source_idx
+
+    @classmethod
+    def from_results(cls, results: List[Dict[str, Any]]) -> "ComponentScores":
+        """Collect the 'Componenten' of match_urls rows run with component_k > 0.
+
+        Args:
+            results: Result rows in source order
+
+        Returns:
+            ComponentScores with one row per kept candidate
+        """
+        source_idx: List[int] = []
+        target_idx: List[int] = []
+        components: List[Tuple[float, ...]] = []
+
+        for pos, row in enumerate(results):
+            for target_id, values in row.get('Componenten', ()):
+                source_idx.append(pos)
+                target_idx.append(target_id)
+                components.append(values)
+
+        return cls(
+            np.asarray(source_idx, dtype=np.int64),
+            np.asarray(target_idx, dtype=np.int64),
+            np.asarray(components, dtype=np.float64).reshape(-1, len(COMPONENT_NAMES)),
+            len(results)
+        )
+
+    @property
+    def nbytes(self) -> int:
+        return self.source_idx.nbytes + self.target_idx.nbytes + self.components.nbytes
+
+    def scores(self, weights: Sequence[float] = DEFAULT_WEIGHTS) -> np.ndarray:
+        """Total score of every candidate row for a weighting."""
+        return self.components @ np.asarray(weights, dtype=np.float64)
+
+    def lookup(self, target_idx: np.ndarray) -> np.ndarray:
+        """Components of one given target per source, e.g. the re-ranked best.
+
+        Args:
+            target_idx: Target position per source, -1 if none
+
+        Returns:
+            Matrix of shape (n_sources, len(COMPONENT_NAMES)); zeros for
+            sources without target or whose target was not kept
+        """
+        target_idx = np.asarray(target_idx, dtype=np.int64)
+        found_components = np.zeros((self.n_sources, len(COMPONENT_NAMES)), dtype=np.float64)
+        if len(self.source_idx) == 0:
+            return found_components
+
+        # One sortable key per (source, target) pair
+        n_targets = int(max(self.target_idx.max(), target_idx.max())) + 1
+        keys = self.source_idx * n_targets + self.target_idx
+        order = np.argsort(keys, kind='stable')
+        sorted_keys = keys[order]
+
+        sources = np.flatnonzero(target_idx >= 0)
+        query = sources * n_targets + target_idx[sources]
+        slots = np.minimum(np.searchsorted(sorted_keys, query), len(sorted_keys) - 1)
+        found = sorted_keys[slots] == query
+        found_components[sources[found]] = self.components[order[slots[found]]]
+        return found_components
+
+    def rerank(self, weights: Sequence[float] = DEFAULT_WEIGHTS) -> Tuple[np.ndarray, np.ndarray]:
+        """Pick the best candidate per source under a weighting.
+
+        Ties go to the lowest target position, as in match_urls.
+
+        Args:
+            weights: One weight per component in COMPONENT_NAMES
+
+        Returns:
+            Tuple of (best target position or -1, best score) per source
+        """
+        best_target = np.full(self.n_sources, -1, dtype=np.int64)
+        best_score = np.zeros(self.n_sources, dtype=np.float64)
+        if len(self.source_idx) == 0:
+            return best_target, best_score
+
+        totals = self.scores(weights)
+        sources = self.source_idx[self._starts]
+        counts = np.diff(np.append(self._starts, len(totals)))
+
+        # Highest score per source, ties go to the lowest target position
+        group_max = np.maximum.reduceat(totals, self._starts)
+        is_max = totals == np.repeat(group_max, counts)
+        masked_targets = np.where(is_max, self.target_idx, np.iinfo(np.int64).max)
+        group_target = np.minimum.reduceat(masked_targets, self._starts)
+
+        # A candidate only counts as a match with a positive score
+        matched = group_max > 0
+        best_target[sources[matched]] = group_target[matched]
+        best_score[sources[matched]] = group_max[matched]
+        return best_target, best_score
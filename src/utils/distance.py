@@ -0,0 +1,137 @@
+import threading
+from difflib import SequenceMatcher
+from typing import Dict, Optional
+
+def levenshtein_distance(s1: str, s2: str, max_distance: Optional[int] = None) -> int:
+    """Calculate the Levenshtein distance with the Myers/Hyyrö bit-parallel algorithm.
+
+    The longer string is encoded as bitmasks in Python integers, so every
+    character of the shorter string costs a handful of big-int operations
+    instead of a full DP row.
+
+    Args:
+        s1: First string
+        s2: Second string
+        max_distance: Optional cutoff. When the distance is certain to exceed
+            it, computation stops and ``max_distance + 1`` is returned
+
+    Returns:
+        The edit distance, or ``max_distance + 1`` if it exceeds the cutoff
+    """
+    if s1 == s2:
+        return 0
+
+    # The pattern (bit vectors) is the longer string, the loop runs over the shorter
+    if len(s1) < len(s2):
+        s1, s2 = s2, s1
+
+    m = len(s1)
+    n = len(s2)
+
+    if max_distance is not None and m - n > max_distance:
+        return max_distance + 1
+    if n == 0:
+        return m
+
+    # Match masks per character of the pattern
+    peq: Dict[str, int] = {}
+    for i, c in enumerate(s1):
+        peq[c] = peq.get(c, 0) | (1 << i)
+
+    mask = (1 << m) - 1
+    last = 1 << (m - 1)
+    pv = mask
+    mv = 0
+    score = m
+
+    for j, c in enumerate(s2):
+        eq = peq.get(c, 0)
+        xv = eq | mv
+        xh = ((((eq & pv) + pv) & mask) ^ pv) | eq
+        ph = (mv | ~(xh | pv)) & mask
+        mh = pv & xh
+
+        if ph & last:
+            score += 1
+        elif mh & last:
+            score -= 1
+
+        # Every remaining column can lower the score by at most one
+        if max_distance is not None and score - (n - j - 1) > max_distance:
+            return max_distance + 1
+
+        ph = ((ph << 1) | 1) & mask
+        mh = (mh << 1) & mask
+        pv = (mh | ~(xv | ph)) & mask
+        mv = ph & xv
+
+    return score
+
+class SimilarityCache:
+    """Reusable SequenceMatchers keyed on the fixed (second) string.
+
+    ``SequenceMatcher.set_seq2`` builds the b2j table and full character
+    count of ``b``; keeping one matcher per ``b`` means that work happens
+    once, and only ``set_seq1`` is called per comparison. The matchers are
+    changed on every call, so a cache must not be shared between threads.
+    """
+
+    def __init__(self, max_size: int = 100000):
+        """Create an empty cache.
+
+        Args:
+            max_size: Maximum number of cached matchers before the cache is reset
+        """
+        self.max_size = max_size
+        self._matchers: Dict[str, SequenceMatcher] = {}
+
+    def ratio_above(self, a: str, b: str, threshold: float) -> float:
+        """Return ``SequenceMatcher(None, a, b).ratio()`` if it exceeds a threshold.
+
+        The O(1) ``real_quick_ratio`` and O(n) ``quick_ratio`` upper bounds
+        are tried first; the full ratio is only computed when both pass.
+
+        Args:
+            a: First string
+            b: Second string, the side that is cached
+            threshold: The ratio has to be strictly greater than this value
+
+        Returns:
+            The ratio if it is above the threshold, otherwise 0.0
+        """
+        matcher = self._matchers.get(b)
+        if matcher is None:
+            if len(self._matchers) >= self.max_size:
+                self._matchers.clear()
+            matcher = SequenceMatcher(None, '', b)
+            self._matchers[b] = matcher
+
+        matcher.set_seq1(a)
+        if matcher.real_quick_ratio() <= threshold or matcher.quick_ratio() <= threshold:
+            return 0.0
+
+        ratio = matcher.ratio()
+        return ratio if ratio > threshold else 0.0
+
+# One cache per thread: Streamlit runs every session in its own thread
+_local = threading.local()
+
+def _similarity_cache() -> SimilarityCache:
+    """Return the SimilarityCache of the current thread, created on first use."""
+    cache = getattr(_local, 'cache', None)
+    if cache is None:
+        cache = _local.cache = SimilarityCache()
+    return cache
+
+def similarity_above(s1: str, s2: str, threshold: float) -> float:
+    """Thresholded similarity ratio using the cache of the current thread.
+
+    Args:
+        s1: First string
+        s2: Second string, usually the side that repeats across calls
+        threshold: The ratio has to be strictly greater than this value
+
+    Returns:
+        The ratio if it is above the threshold, otherwise 0.0
+    """
+    return _similarity_cache().ratio_above(s1, s2, threshold)
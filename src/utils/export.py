@@ -1,9 +1,70 @@
 import pandas as pd
 import logging
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, TextIO
 
 logger = logging.getLogger(__name__)
 
+HTACCESS_HEADER = (
+    "# Redirect mappings generated by URL Redirect Mapper\n"
+    "# Format: RedirectPermanent source_path target_url\n\n"
+    "RewriteEngine On\n\n"
+)
+
+def write_csv_rows(df: pd.DataFrame, f: TextIO, header: bool = True) -> None:
+    """Write results to an open CSV file, e.g. one chunk at a time.
+    
+    Args:
+        df: DataFrame with mapping results
+        f: Text file opened with newline=''
+        header: Write the column names first; only for the first chunk
+    """
+    df.to_csv(f, index=False, header=header)
+
+def write_htaccess_header(f: TextIO) -> None:
+    """Write the comments and RewriteEngine directive that start an .htaccess file."""
+    f.write(HTACCESS_HEADER)
+
+def write_htaccess_rules(df: pd.DataFrame, f: TextIO,
+                         source_col: str = "source_url",
+                         target_col: str = "suggested_target",
+                         confidence_col: str = "confidence_score",
+                         min_confidence: float = 0.5) -> int:
+    """Append a RedirectPermanent rule per result to an open .htaccess file.
+    
+    Args:
+        df: DataFrame with mapping results
+        f: Text file to write to
+        source_col: Column name for source URLs
+        target_col: Column name for target URLs
+        confidence_col: Column name for confidence scores
+        min_confidence: Minimum confidence to include in the output
+        
+    Returns:
+        Number of results at or above the minimum confidence
+    """
+    # Filter by confidence and write redirects
+    filtered_df = df[df[confidence_col] >= min_confidence]
+    
+    lines = []
+    for source, target in zip(filtered_df[source_col].tolist(), filtered_df[target_col].tolist()):
+        if pd.isna(target) or not target:
+            continue
+        
+        # Extract source path
+        if "://" in source:
+            source_path = source.split("://", 1)[1]
+            if "/" in source_path:
+                source_path = "/" + source_path.split("/", 1)[1]
+            else:
+                source_path = "/"
+        else:
+            source_path = source
+        
+        lines.append(f"RedirectPermanent {source_path} {target}\n")
+    
+    f.writelines(lines)
+    return len(filtered_df)
+
 def export_to_csv(df: pd.DataFrame, output_file: str) -> None:
     """Export results to CSV format.
     
@@ -12,7 +73,8 @@ def export_to_csv(df: pd.DataFrame, output_file: str) -> None:
         output_file: Path to the output CSV file
     """
     try:
-        df.to_csv(output_file, index=False, encoding='utf-8')
+        with open(output_file, 'w', encoding='utf-8', newline='') as f:
+            write_csv_rows(df, f)
         logger.info(f"Exported {len(df)} mappings to {output_file}")
     except Exception as e:
         logger.error(f"Error exporting to CSV: {str(e)}")
@@ -35,38 +97,10 @@ def export_to_htaccess(df: pd.DataFrame, output_file: str,
     """
     try:
         with open(output_file, 'w', encoding='utf-8') as f:
-            # Write header comment
-            f.write("# Redirect mappings generated by URL Redirect Mapper\n")
-            f.write("# Format: RedirectPermanent source_path target_url\n\n")
-            
-            # Write RewriteEngine directive
-            f.write("RewriteEngine On\n\n")
-            
-            # Filter by confidence and write redirects
-            filtered_df = df[df[confidence_col] >= min_confidence].copy()
-            
-            for _, row in filtered_df.iterrows():
-                source = row[source_col]
-                target = row[target_col]
-                
-                if pd.isna(target) or not target:
-                    continue
-                
-                # Extract source path
-                if "://" in source:
-                    source_path = source.split("://", 1)[1]
-                    if "/" in source_path:
-                        source_path = "/" + source_path.split("/", 1)[1]
-                    else:
-                        source_path = "/"
-                else:
-                    source_path = source
-                
-                # Write redirect rule
-                f.write(f"RedirectPermanent {source_path} {target}\n")
-            
-            logger.info(f"Exported {len(filtered_df)} redirects to .htaccess file: {output_file}")
+            write_htaccess_header(f)
+            count = write_htaccess_rules(df, f, source_col, target_col, confidence_col, min_confidence)
+            logger.info(f"Exported {count} redirects to .htaccess file: {output_file}")
     
     except Exception as e:
         logger.error(f"Error exporting to .htaccess: {str(e)}")
-        raise 
\ No newline at end of file
+        raise
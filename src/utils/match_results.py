@@ -0,0 +1,215 @@
+import copy
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from utils.component_scores import COMPONENT_NAMES
+from utils.target_corpus import TargetCorpus
+
+class MatchResults:
+    """Columnar store for the result of a match run.
+
+    URLs are kept once, in the source list and the target corpus; every row
+    only holds a target position, the raw score and the reason code. Object
+    arrays share the original string objects, so building a DataFrame copies
+    pointers instead of URLs. A cached MatchResults keeps those strings
+    alive, so their size is counted once and included in nbytes.
+    """
+
+    def __init__(self, source_urls: Sequence[str], target_urls: Sequence[str],
+                 target_idx: np.ndarray, scores: np.ndarray, reason_codes: np.ndarray,
+                 candidate_idx: Optional[np.ndarray] = None,
+                 candidate_scores: Optional[np.ndarray] = None,
+                 string_nbytes: Optional[int] = None,
+                 components: Optional[np.ndarray] = None,
+                 source_segment_counts: Optional[np.ndarray] = None,
+                 source_word_counts: Optional[np.ndarray] = None,
+                 target_segment_counts: Optional[np.ndarray] = None,
+                 target_word_counts: Optional[np.ndarray] = None):
+        """Wrap existing arrays.
+
+        Args:
+            source_urls: Source URLs, one per row in row order
+            target_urls: All target URLs of the corpus
+            target_idx: Target position of the best match per row, -1 if none
+            scores: Raw score per row
+            reason_codes: Reason code bitmask per row (REASON_* in url_matcher)
+            candidate_idx: Optional (rows, k) matrix of the top-k target
+                positions, padded with -1
+            candidate_scores: Optional (rows, k) matrix of the rounded top-k scores
+            string_nbytes: Size of the URL strings, if already known
+            components: Optional (rows, len(COMPONENT_NAMES)) matrix with the
+                score components of the chosen target, zeros if none
+            source_segment_counts: Optional number of path segments per source
+            source_word_counts: Optional number of words per source
+            target_segment_counts: Optional number of path segments per target
+            target_word_counts: Optional number of words per target
+        """
+        self.source_urls = np.asarray(source_urls, dtype=object)
+        self.target_urls = np.asarray(target_urls, dtype=object)
+        self.target_idx = target_idx
+        self.scores = scores
+        self.reason_codes = reason_codes
+        self.candidate_idx = candidate_idx
+        self.candidate_scores = candidate_scores
+        if string_nbytes is None:
+            string_nbytes = (sum(map(sys.getsizeof, self.source_urls))
+                             + sum(map(sys.getsizeof, self.target_urls)))
+        self.string_nbytes = string_nbytes
+        self.components = components
+        self.source_segment_counts = source_segment_counts
+        self.source_word_counts = source_word_counts
+        self.target_segment_counts = target_segment_counts
+        self.target_word_counts = target_word_counts
+
+    @classmethod
+    def from_rows(cls, rows: List[Dict[str, Any]], source_urls: Sequence[str],
+                  corpus: TargetCorpus) -> "MatchResults":
+        """Convert match_urls rows to columns.
+
+        Args:
+            rows: Result rows of match_urls, one per source URL in order
+            source_urls: The source URLs that were matched
+            corpus: Target corpus the rows were matched against
+
+        Returns:
+            MatchResults holding the same data without the per-row dicts
+        """
+        n = len(rows)
+        target_idx = np.fromiter((row['Target id'] for row in rows), dtype=np.int32, count=n)
+        scores = np.fromiter((row['Score'] for row in rows), dtype=np.float64, count=n)
+        reason_codes = np.fromiter((row['Reden code'] for row in rows), dtype=np.uint8, count=n)
+        source_segment_counts = np.fromiter((row['Bron segmenten'] for row in rows), dtype=np.int32, count=n)
+        source_word_counts = np.fromiter((row['Bron woorden'] for row in rows), dtype=np.int32, count=n)
+
+        # Components of the chosen target, if match_urls kept them (component_k > 0)
+        components = None
+        if n and 'Componenten' in rows[0]:
+            components = np.zeros((n, len(COMPONENT_NAMES)), dtype=np.float64)
+            for pos, row in enumerate(rows):
+                for target_id, values in row['Componenten']:
+                    if target_id == row['Target id']:
+                        components[pos] = values
+                        break
+
+        candidate_idx = candidate_scores = None
+        if n and 'Top kandidaten' in rows[0]:
+            k = max(len(row['Top kandidaten']) for row in rows)
+            candidate_idx = np.full((n, k), -1, dtype=np.int32)
+            candidate_scores = np.zeros((n, k), dtype=np.float32)
+            for pos, row in enumerate(rows):
+                for col, (target_id, (_, score)) in enumerate(zip(row['Top kandidaat ids'], row['Top kandidaten'])):
+                    candidate_idx[pos, col] = target_id
+                    candidate_scores[pos, col] = score
+
+        # Only the counts per target are kept, not the parsed corpus itself
+        target_segment_counts = np.fromiter(map(len, corpus.segments), dtype=np.int32, count=len(corpus))
+        target_word_counts = np.fromiter(map(len, corpus.words), dtype=np.int32, count=len(corpus))
+
+        return cls(source_urls, corpus.urls, target_idx, scores, reason_codes,
+                   candidate_idx, candidate_scores, components=components,
+                   source_segment_counts=source_segment_counts,
+                   source_word_counts=source_word_counts,
+                   target_segment_counts=target_segment_counts,
+                   target_word_counts=target_word_counts)
+
+    def __len__(self) -> int:
+        return len(self.scores)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the row arrays plus the URL strings they point to."""
+        size = (self.string_nbytes + self.source_urls.nbytes + self.target_urls.nbytes + self.target_idx.nbytes
+                + self.scores.nbytes + self.reason_codes.nbytes)
+        for array in (self.candidate_idx, self.candidate_scores, self.components,
+                      self.source_segment_counts, self.source_word_counts,
+                      self.target_segment_counts, self.target_word_counts):
+            if array is not None:
+                size += array.nbytes
+        return size
+
+    @property
+    def matched(self) -> np.ndarray:
+        """Boolean mask of the rows that have a target."""
+        return self.target_idx >= 0
+
+    def with_targets(self, target_idx: np.ndarray, scores: np.ndarray, reason_codes: np.ndarray,
+                     components: Optional[np.ndarray] = None) -> "MatchResults":
+        """Return a view with other best targets, e.g. after re-weighting.
+
+        Args:
+            target_idx: New target position per row, -1 if none
+            scores: New raw score per row
+            reason_codes: Reason codes of the new targets
+            components: Score components of the new targets, if known
+
+        Returns:
+            MatchResults sharing the URLs, top-k candidates and source counts
+            with this one
+        """
+        view = copy.copy(self)
+        view.target_idx = target_idx
+        view.scores = scores
+        view.reason_codes = reason_codes
+        view.components = components
+        return view
+
+    def target_column(self, positions: Optional[np.ndarray] = None) -> np.ndarray:
+        """Target URL per row as an object array, "" for rows without a match."""
+        target_idx = self.target_idx if positions is None else self.target_idx[positions]
+        # Position -1 wraps to the last target and is blanked afterwards
+        targets = self.target_urls[target_idx] if len(self.target_urls) else np.full(len(target_idx), "", dtype=object)
+        targets[target_idx < 0] = ""
+        return targets
+
+    def candidates(self, positions: Optional[np.ndarray] = None) -> List[List[tuple]]:
+        """Top-k candidates per row as (url, score) lists, as in match_urls."""
+        candidate_idx = self.candidate_idx if positions is None else self.candidate_idx[positions]
+        candidate_scores = self.candidate_scores if positions is None else self.candidate_scores[positions]
+        return [
+            [(self.target_urls[idx], round(float(score), 2)) for idx, score in zip(ids, row_scores) if idx >= 0]
+            for ids, row_scores in zip(candidate_idx, candidate_scores)
+        ]
+
+    def to_frame(self, positions: Optional[np.ndarray] = None) -> pd.DataFrame:
+        """Build the result table, optionally for a subset of the rows only.
+
+        URL columns are object columns pointing at the stored strings.
+
+        Args:
+            positions: Optional array of row positions to include
+
+        Returns:
+            DataFrame with the columns of match_urls rows
+        """
+        if positions is None:
+            source = self.source_urls
+            columns = {
+                'Score': self.scores,
+                'Reden code': self.reason_codes,
+                'Match gevonden': self.matched,
+            }
+            index = None
+        else:
+            positions = np.asarray(positions, dtype=np.intp)
+            source = self.source_urls[positions]
+            columns = {
+                'Score': self.scores[positions],
+                'Reden code': self.reason_codes[positions],
+                'Match gevonden': self.target_idx[positions] >= 0,
+            }
+            index = positions
+
+        frame = pd.DataFrame({
+            'Source URL': pd.Series(source, dtype=object, copy=False),
+            'Target URL': pd.Series(self.target_column(positions), dtype=object, copy=False),
+        })
+        for name, values in columns.items():
+            frame[name] = values
+        if self.candidate_idx is not None:
+            frame['Top kandidaten'] = self.candidates(positions)
+        if index is not None:
+            frame.index = index
+        return frame
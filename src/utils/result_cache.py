@@ -0,0 +1,99 @@
+import hashlib
+import json
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+def make_result_key(source_bytes: bytes, target_bytes: bytes, params: Dict[str, Any]) -> str:
+    """Build a cache key from the uploaded file contents and matching parameters.
+
+    Args:
+        source_bytes: Raw bytes of the source file
+        target_bytes: Raw bytes of the target file
+        params: Parameters that influence the match results
+
+    Returns:
+        Hex digest identifying this combination of inputs
+    """
+    digest = hashlib.sha256()
+    for part in (source_bytes, target_bytes, json.dumps(params, sort_keys=True).encode()):
+        # Length prefix so the boundary between the parts is unambiguous
+        digest.update(len(part).to_bytes(8, 'big'))
+        digest.update(part)
+    return digest.hexdigest()
+
+def estimate_size(value: Any) -> int:
+    """Roughly estimate the memory used by a result set in bytes.
+
+    Args:
+        value: Result object (list of row dicts, DataFrame, arrays, bytes,
+            or a dict of those)
+
+    Returns:
+        Estimated size in bytes
+    """
+    if isinstance(value, dict):
+        return sum(estimate_size(v) for v in value.values())
+    if hasattr(value, 'nbytes'):
+        return int(value.nbytes)
+    if hasattr(value, 'memory_usage'):
+        return int(value.memory_usage(deep=True).sum())
+    if isinstance(value, (bytes, str)):
+        return len(value)
+    if isinstance(value, list):
+        return sum(
+            sum(len(str(v)) + 50 for v in row.values()) if isinstance(row, dict) else len(str(row))
+            for row in value
+        )
+    return len(str(value))
+
+class ResultCache:
+    """Thread-safe LRU cache for match results with a size budget."""
+
+    def __init__(self, max_bytes: int = 512 * 1024 * 1024):
+        """Create an empty cache.
+
+        Args:
+            max_bytes: Total estimated size after which the least recently
+                used entries are evicted
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, Any]" = OrderedDict()
+        self._sizes: Dict[str, int] = {}
+        self._total = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value for a key, or None."""
+        with self._lock:
+            if key not in self._entries:
+                return None
+            self._entries.move_to_end(key)
+            return self._entries[key]
+
+    def put(self, key: str, value: Any) -> None:
+        """Store a value and evict least recently used entries over budget."""
+        size = estimate_size(value)
+        with self._lock:
+            if key in self._entries:
+                self._total -= self._sizes.pop(key)
+                del self._entries[key]
+
+            # Larger than the whole budget: do not cache at all
+            if size > self.max_bytes:
+                return
+
+            self._entries[key] = value
+            self._sizes[key] = size
+            self._total += size
+
+            while self._total > self.max_bytes:
+                old_key, _ = self._entries.popitem(last=False)
+                self._total -= self._sizes.pop(old_key)
+
+    def __contains__(self, key: str) -> bool:
+        with self._lock:
+            return key in self._entries
+
+    def __len__(self) -> int:
+        return len(self._entries)
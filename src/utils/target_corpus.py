@@ -0,0 +1,54 @@
+from urllib.parse import urlparse
+from typing import FrozenSet, Iterable, List, Optional, Tuple
+
+from utils.url_index import WORD_RE, TokenIndex
+
+def split_url(url: str) -> Tuple[str, str, Tuple[str, ...], FrozenSet[str]]:
+    """Split a URL into the fields used for matching.
+
+    Args:
+        url: The URL to split
+
+    Returns:
+        Tuple of (netloc, stripped path, path segments, lower-cased words)
+    """
+    parsed = urlparse(url)
+    path = parsed.path.strip('/')
+    segments = tuple(seg for seg in path.split('/') if seg)
+    words = frozenset(WORD_RE.findall(url.lower()))
+    return parsed.netloc, path, segments, words
+
+class TargetCorpus:
+    """Target URLs parsed once, reusable across match runs and source files."""
+
+    def __init__(self, target_urls: Iterable[str], max_df: Optional[float] = None):
+        """Parse all target URLs.
+
+        Args:
+            target_urls: Target URLs in their original order
+            max_df: Optional maximum document frequency for the token index
+        """
+        self.urls: List[str] = list(target_urls)
+        self.netlocs: List[str] = []
+        self.paths: List[str] = []
+        self.segments: List[Tuple[str, ...]] = []
+        self.words: List[FrozenSet[str]] = []
+        self.max_df = max_df
+        self._index: Optional[TokenIndex] = None
+
+        for url in self.urls:
+            netloc, path, segments, words = split_url(url)
+            self.netlocs.append(netloc)
+            self.paths.append(path)
+            self.segments.append(segments)
+            self.words.append(words)
+
+    def __len__(self) -> int:
+        return len(self.urls)
+
+    @property
+    def index(self) -> TokenIndex:
+        """Inverted token index, built on first use."""
+        if self._index is None:
+            self._index = TokenIndex(self.urls, max_df=self.max_df)
+        return self._index
@@ -0,0 +1,106 @@
+from typing import Sequence
+
+import numpy as np
+
+def _trigram_codes(code_points: np.ndarray) -> np.ndarray:
+    """Pack every run of three code points into one 63-bit integer."""
+    c0 = code_points[:-2].astype(np.uint64)
+    c1 = code_points[1:-1].astype(np.uint64)
+    c2 = code_points[2:].astype(np.uint64)
+    return (c0 << np.uint64(42)) | (c1 << np.uint64(21)) | c2
+
+def _code_points(text: str) -> np.ndarray:
+    """Unicode code points of a string as a uint32 array."""
+    return np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+
+class TrigramIndex:
+    """Case-insensitive substring index over a fixed list of strings.
+
+    Every lower-cased string is split into overlapping trigrams; a query
+    only has to check the strings that contain all of its trigrams. The
+    postings are stored as one sorted NumPy array instead of a dict of lists,
+    so building the index for hundreds of thousands of URLs is a few
+    vectorized passes.
+    """
+
+    def __init__(self, texts: Sequence[str]):
+        """Build the index once.
+
+        Args:
+            texts: Strings to index, positions are used as document ids
+        """
+        self.texts = texts
+        lowered = [str(text).lower() for text in texts]
+        lengths = np.fromiter((len(text) for text in lowered), dtype=np.int64, count=len(lowered))
+
+        # All strings in one code point array, separated by NUL
+        code_points = _code_points('\x00'.join(lowered) + '\x00')
+        doc_ids = np.repeat(np.arange(len(lowered), dtype=np.int32), lengths + 1)
+
+        if len(code_points) >= 3:
+            codes = _trigram_codes(code_points)
+            valid = (code_points[:-2] != 0) & (code_points[1:-1] != 0) & (code_points[2:] != 0)
+            codes = codes[valid]
+            docs = doc_ids[:-2][valid]
+        else:
+            codes = np.empty(0, dtype=np.uint64)
+            docs = np.empty(0, dtype=np.int32)
+
+        # Stable sort keeps the documents of one trigram in ascending order
+        order = np.argsort(codes, kind='stable')
+        codes = codes[order]
+        docs = docs[order]
+        if len(codes):
+            keep = np.r_[True, (codes[1:] != codes[:-1]) | (docs[1:] != docs[:-1])]
+            codes = codes[keep]
+            docs = docs[keep]
+
+        starts = np.flatnonzero(np.r_[True, codes[1:] != codes[:-1]]) if len(codes) else np.empty(0, dtype=np.int64)
+        self.keys = codes[starts]
+        self.offsets = np.append(starts, len(codes))
+        self.postings = docs
+
+    def __len__(self) -> int:
+        return len(self.texts)
+
+    @property
+    def nbytes(self) -> int:
+        return self.keys.nbytes + self.offsets.nbytes + self.postings.nbytes
+
+    def search(self, term: str) -> np.ndarray:
+        """Find the strings that contain a term, ignoring case.
+
+        Args:
+            term: Literal substring to look for
+
+        Returns:
+            Sorted array of matching positions
+        """
+        term = term.lower()
+        if len(term) < 3:
+            # Too short for a trigram: check every string
+            return np.flatnonzero(np.fromiter(
+                (term in str(text).lower() for text in self.texts), dtype=bool, count=len(self.texts)
+            ))
+
+        query = np.unique(_trigram_codes(_code_points(term)))
+        slots = np.searchsorted(self.keys, query)
+        if np.any(slots >= len(self.keys)) or np.any(self.keys[np.minimum(slots, len(self.keys) - 1)] != query):
+            return np.empty(0, dtype=np.int64)
+
+        # Intersect from the shortest posting list up
+        lists = sorted(
+            (self.postings[self.offsets[slot]:self.offsets[slot + 1]] for slot in slots),
+            key=len
+        )
+        candidates = lists[0]
+        for postings in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, postings, assume_unique=True)
+
+        # Trigrams do not guarantee order and adjacency, so verify the survivors
+        return np.array(
+            [doc for doc in candidates.tolist() if term in str(self.texts[doc]).lower()],
+            dtype=np.int64
+        )
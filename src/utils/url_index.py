@@ -0,0 +1,66 @@
+from urllib.parse import urlparse
+from typing import Dict, Iterable, List, Optional, Set
+import re
+
+WORD_RE = re.compile(r'\w+')
+
+def url_tokens(url: str) -> Set[str]:
+    """Extract the blocking tokens of a URL.
+
+    Only the path is tokenized: domain words (``www``, ``com``, the brand
+    name) are shared by nearly every URL of a site and would put every
+    target in every candidate set.
+
+    Args:
+        url: The URL to tokenize
+
+    Returns:
+        Set of path segments and lower-cased word tokens
+    """
+    path = urlparse(url).path.strip('/')
+    tokens = {seg for seg in path.split('/') if seg}
+    tokens.update(WORD_RE.findall(path.lower()))
+    return tokens
+
+class TokenIndex:
+    """Inverted index from path tokens to target URL positions."""
+
+    def __init__(self, target_urls: Iterable[str], max_df: Optional[float] = None):
+        """Build the index once for a target corpus.
+
+        Args:
+            target_urls: Target URLs, positions are used as document ids
+            max_df: Optional maximum document frequency (0-1). Tokens that
+                occur in a larger fraction of the targets are not indexed
+        """
+        self.target_urls = list(target_urls)
+        self.postings: Dict[str, List[int]] = {}
+        self.exact: Dict[str, int] = {}
+
+        for idx, url in enumerate(self.target_urls):
+            self.exact.setdefault(url, idx)
+            for token in url_tokens(url):
+                self.postings.setdefault(token, []).append(idx)
+
+        if max_df is not None:
+            limit = max_df * len(self.target_urls)
+            self.postings = {
+                token: ids for token, ids in self.postings.items() if len(ids) <= limit
+            }
+
+    def __len__(self) -> int:
+        return len(self.target_urls)
+
+    def candidates(self, url: str) -> List[int]:
+        """Return the targets that share at least one token with a URL.
+
+        Args:
+            url: The source URL
+
+        Returns:
+            Sorted list of target positions, empty if nothing overlaps
+        """
+        ids: Set[int] = set()
+        for token in url_tokens(url):
+            ids.update(self.postings.get(token, ()))
+        return sorted(ids)
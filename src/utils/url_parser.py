@@ -1,29 +1,108 @@
+from functools import lru_cache
 from urllib.parse import urlparse, parse_qs, unquote
-from typing import Dict, Tuple, List, Optional, Any
+from typing import Dict, Tuple, List, NamedTuple, Optional
 import re
 
-def parse_url(url: str) -> Optional[Dict[str, Any]]:
+# Number of distinct raw URLs whose parse result is kept
+PARSE_CACHE_SIZE = 100000
+
+# Language code as the whole subdomain or as the first path segment
+_SUBDOMAIN_LANGUAGE = re.compile(r'^[a-z]{2}(-[a-z]{2})?$', re.IGNORECASE)
+_PATH_LANGUAGE = re.compile(r'^/([a-z]{2}(-[a-z]{2})?)(\/|$)', re.IGNORECASE)
+
+# Characters urlparse treats specially (params, IPv6 hosts, stripped
+# whitespace); URLs containing them skip the fast path
+_SLOW_PATH_CHARS = re.compile(r'[;\[\]\t\r\n]')
+
+class ParsedURL(NamedTuple):
+    """Immutable URL components with additional metadata.
+    
+    A tuple per URL instead of a dict keeps parsing millions of URLs cheap.
+    The query string is only split into a dict when ``query`` is read.
+    """
+    original_url: str
+    scheme: str
+    netloc: str
+    domain: str
+    subdomain: str
+    path: str
+    query_string: str
+    fragment: str
+    path_segments: Tuple[str, ...]
+    language_code: Optional[str]
+    
+    @property
+    def query(self) -> Dict[str, List[str]]:
+        """Query parameters as returned by parse_qs."""
+        return parse_qs(self.query_string)
+
+def parse_url(url: str) -> Optional[ParsedURL]:
     """Parse a URL into its components with additional metadata.
     
+    Results are kept in a bounded LRU cache keyed on the raw URL string,
+    so repeated URLs cost a dict lookup. ParsedURL is immutable, which
+    makes sharing one result between callers safe.
+    
     Args:
         url: The URL to parse
         
     Returns:
-        Dictionary containing URL components and metadata
+        ParsedURL containing URL components and metadata, or None if the
+        URL cannot be parsed
+    """
+    if not isinstance(url, str):
+        return None
+    return _cached_parse_url(url)
+
+def clear_parse_cache() -> None:
+    """Empty the parse_url cache."""
+    _cached_parse_url.cache_clear()
+
+def parse_cache_info() -> Tuple[int, int, Optional[int], int]:
+    """Hits, misses, maximum size and current size of the parse_url cache."""
+    return _cached_parse_url.cache_info()
+
+def _split_components(url: str) -> Tuple[str, str, str, str, str]:
+    """Split a normalized URL into scheme, netloc, path, query and fragment.
+    
+    Plain ``scheme://host/path?query#fragment`` URLs are split with
+    str.partition; anything unusual goes through urlparse, which gives
+    the same result for the plain case.
+    
+    Args:
+        url: URL starting with http:// or https://
+        
+    Returns:
+        Tuple of (scheme, netloc, path, query, fragment)
     """
+    if url.startswith(('http://', 'https://')) and _SLOW_PATH_CHARS.search(url) is None:
+        scheme, _, rest = url.partition('://')
+        
+        # The host ends at the first '/', '?' or '#'
+        end = len(rest)
+        for separator in '/?#':
+            index = rest.find(separator, 0, end)
+            if index >= 0:
+                end = index
+        netloc = rest[:end]
+        
+        # urlparse validates non-ASCII hosts, so leave those to it
+        if netloc.isascii():
+            rest, _, fragment = rest[end:].partition('#')
+            path, _, query = rest.partition('?')
+            return scheme, netloc, path, query, fragment
+    
+    parsed = urlparse(url)
+    return parsed.scheme, parsed.netloc, parsed.path, parsed.query, parsed.fragment
+
+def _parse_url(url: str) -> Optional[ParsedURL]:
+    """Parse a URL without the cache; see parse_url."""
     try:
         # Normalize the URL
         url = normalize_url(url)
         
-        # Parse with urllib
-        parsed = urlparse(url)
-        
         # Extract components
-        scheme = parsed.scheme
-        netloc = parsed.netloc
-        path = parsed.path
-        query = parse_qs(parsed.query)
-        fragment = parsed.fragment
+        scheme, netloc, path, query_string, fragment = _split_components(url)
         
         # Split domain parts
         domain_parts = netloc.split('.')
@@ -40,23 +119,25 @@ def parse_url(url: str) -> Optional[Dict[str, Any]]:
         lang_code = extract_language_code(subdomain, path)
         
         # Split path into segments
-        path_segments = [seg for seg in path.split('/') if seg]
+        path_segments = tuple(seg for seg in path.split('/') if seg)
         
-        return {
-            'original_url': url,
-            'scheme': scheme,
-            'netloc': netloc,
-            'domain': domain,
-            'subdomain': subdomain,
-            'path': path,
-            'query': query,
-            'fragment': fragment,
-            'path_segments': path_segments,
-            'language_code': lang_code
-        }
+        return ParsedURL(
+            url,
+            scheme,
+            netloc,
+            domain,
+            subdomain,
+            path,
+            query_string,
+            fragment,
+            path_segments,
+            lang_code
+        )
     except Exception as e:
         return None
 
+_cached_parse_url = lru_cache(maxsize=PARSE_CACHE_SIZE)(_parse_url)
+
 def normalize_url(url: str) -> str:
     """Normalize a URL by ensuring scheme and decoding.
     
@@ -91,12 +172,12 @@ def extract_language_code(subdomain: str, path: str) -> Optional[str]:
     """
     # Check for language code in subdomain (e.g., en.example.com)
     if subdomain and len(subdomain) in (2, 5):  # 2 for 'en', 5 for 'en-us'
-        if re.match(r'^[a-z]{2}(-[a-z]{2})?$', subdomain, re.IGNORECASE):
+        if _SUBDOMAIN_LANGUAGE.match(subdomain):
             return subdomain.lower()
     
     # Check for language code in path (e.g., example.com/en/)
     if path and len(path) >= 3:
-        match = re.match(r'^/([a-z]{2}(-[a-z]{2})?)(\/|$)', path, re.IGNORECASE)
+        match = _PATH_LANGUAGE.match(path)
         if match:
             return match.group(1).lower()
     
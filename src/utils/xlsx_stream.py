@@ -0,0 +1,186 @@
+import io
+import os
+import tempfile
+import threading
+from typing import Any, Dict, IO, Iterable, List, Optional, Sequence, Tuple, Union
+
+import pandas as pd
+import xlsxwriter
+
+# Rows per worksheet in Excel, including the header row
+EXCEL_MAX_ROWS = 1048576
+
+# Sheet names are limited to 31 characters in Excel
+SHEET_NAME_LENGTH = 31
+
+def spooled_output(max_memory: int = 64 * 1024 * 1024) -> IO[bytes]:
+    """Create an output file that moves to disk once it grows past a size.
+
+    Args:
+        max_memory: Number of bytes kept in memory before spilling to a
+            temporary file
+
+    Returns:
+        Binary file object to pass to StreamingXlsxWriter
+    """
+    return tempfile.SpooledTemporaryFile(max_size=max_memory, mode='w+b')
+
+class SharedOutput:
+    """A finished output file that can be downloaded without reading it into bytes.
+
+    st.download_button accepts raw file objects and reads them itself. Every
+    call to open() returns a reader with its own position, so the same cached
+    export can be downloaded from several sessions at once.
+    """
+
+    def __init__(self, output: IO[bytes]):
+        """Wrap a finished output file.
+
+        Args:
+            output: Binary file object that is no longer written to
+        """
+        self._output = output
+        self._lock = threading.Lock()
+        self.nbytes = output.seek(0, os.SEEK_END)
+
+    def open(self) -> "_OutputReader":
+        """Return a new read-only file object positioned at the start."""
+        return _OutputReader(self)
+
+class _OutputReader(io.RawIOBase):
+    """Read-only view on a SharedOutput; reads seek the shared file under its lock."""
+
+    def __init__(self, shared: SharedOutput):
+        self._shared = shared
+        self._position = 0
+
+    def readable(self) -> bool:
+        return True
+
+    def seekable(self) -> bool:
+        return True
+
+    def seek(self, offset: int, whence: int = os.SEEK_SET) -> int:
+        if whence == os.SEEK_CUR:
+            offset += self._position
+        elif whence == os.SEEK_END:
+            offset += self._shared.nbytes
+        self._position = max(0, offset)
+        return self._position
+
+    def tell(self) -> int:
+        return self._position
+
+    def readinto(self, buffer) -> int:
+        with self._shared._lock:
+            self._shared._output.seek(self._position)
+            count = self._shared._output.readinto(buffer)
+        self._position += count
+        return count
+
+class StreamingXlsxWriter:
+    """Write an xlsx file row by row, continuing on a new sheet when one is full.
+
+    Every sheet gets the same header row, column widths, frozen header and
+    autofilter. Sheets after the first are numbered: "Redirects",
+    "Redirects 2", "Redirects 3", ... In constant_memory mode xlsxwriter
+    flushes every finished row to a temporary file, so memory use does not
+    grow with the number of rows.
+    """
+
+    def __init__(self, output: Union[str, IO[bytes]], sheet_name: str, columns: Sequence[str],
+                 constant_memory: bool = True, strings_to_urls: bool = False,
+                 header_format: Optional[Dict[str, Any]] = None,
+                 column_widths: Optional[Dict[Tuple[int, int], float]] = None,
+                 freeze_header: bool = False, autofilter: bool = False,
+                 max_rows: int = EXCEL_MAX_ROWS):
+        """Open the workbook.
+
+        Args:
+            output: File path or binary file object to write the workbook to
+            sheet_name: Name of the first sheet, also the base for numbered sheets
+            columns: Header row, repeated on every sheet
+            constant_memory: Flush rows to disk as they are written
+            strings_to_urls: Turn strings that look like URLs into hyperlinks
+            header_format: Optional xlsxwriter format properties for the header
+            column_widths: Optional {(first_col, last_col): width} per sheet
+            freeze_header: Freeze the header row on every sheet
+            autofilter: Add an autofilter over the rows of every sheet
+            max_rows: Rows per sheet including the header
+        """
+        self.workbook = xlsxwriter.Workbook(output, {
+            'constant_memory': constant_memory,
+            'strings_to_urls': strings_to_urls
+        })
+        self.sheet_name = sheet_name
+        self.columns: List[str] = [str(column) for column in columns]
+        self.column_widths = column_widths or {}
+        self.freeze_header = freeze_header
+        self.autofilter = autofilter
+        self.max_rows = max_rows
+        self.header_format = self.workbook.add_format(header_format) if header_format else None
+
+        self.worksheet = None
+        self.sheet_count = 0
+        self.rows_written = 0
+        self._row = 0
+
+    def add_format(self, properties: Dict[str, Any]):
+        """Register a cell format on the workbook."""
+        return self.workbook.add_format(properties)
+
+    def _sheet_title(self) -> str:
+        """Name of the current sheet, numbered from the second sheet on."""
+        if self.sheet_count == 1:
+            return self.sheet_name[:SHEET_NAME_LENGTH]
+        suffix = f" {self.sheet_count}"
+        return self.sheet_name[:SHEET_NAME_LENGTH - len(suffix)] + suffix
+
+    def _finish_sheet(self) -> None:
+        """Add the autofilter once the rows of a sheet are known."""
+        if self.worksheet is not None and self.autofilter:
+            self.worksheet.autofilter(0, 0, self._row - 1, len(self.columns) - 1)
+
+    def _new_sheet(self) -> None:
+        """Start the next sheet with the layout and header row."""
+        self._finish_sheet()
+        self.sheet_count += 1
+        self.worksheet = self.workbook.add_worksheet(self._sheet_title())
+
+        # Layout first: in constant_memory mode rows can only be written in order
+        for (first_col, last_col), width in self.column_widths.items():
+            self.worksheet.set_column(first_col, last_col, width)
+        if self.freeze_header:
+            self.worksheet.freeze_panes(1, 0)
+
+        self.worksheet.write_row(0, 0, self.columns, self.header_format)
+        self._row = 1
+
+    def write_row(self, values: Iterable[Any], cell_format=None) -> None:
+        """Append one data row.
+
+        Args:
+            values: Cell values in column order; NaN, None, pd.NA and NaT are
+                written as empty cells
+            cell_format: Optional format for every cell of the row
+        """
+        if self.worksheet is None or self._row >= self.max_rows:
+            self._new_sheet()
+
+        row = [None if pd.api.types.is_scalar(value) and pd.isna(value) else value for value in values]
+        self.worksheet.write_row(self._row, 0, row, cell_format)
+        self._row += 1
+        self.rows_written += 1
+
+    def close(self) -> None:
+        """Finish the last sheet and write the workbook."""
+        if self.worksheet is None:
+            self._new_sheet()
+        self._finish_sheet()
+        self.workbook.close()
+
+    def __enter__(self) -> "StreamingXlsxWriter":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()